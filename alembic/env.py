@@ -1,23 +1,30 @@
 from logging.config import fileConfig
+import logging
+import time
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.exc import OperationalError
 
 from alembic import context
 
-from src.users_service.config.settings import SYNC_DATABASE_URL
+from src.users_service.config.settings import (
+    SYNC_SHARD_URLS, MIGRATION_LOCK_TIMEOUT, MIGRATION_STATEMENT_TIMEOUT,
+    MIGRATION_RETRIES, MIGRATION_RETRY_DELAY,
+)
 from src.users_service.infrastructure.db.models import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", SYNC_DATABASE_URL)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+logger = logging.getLogger("alembic.env")
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -28,6 +35,17 @@ target_metadata = Base.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
+x_arguments = context.get_x_argument(as_dictionary=True)
+
+lock_timeout = x_arguments.get("lock_timeout", MIGRATION_LOCK_TIMEOUT)
+statement_timeout = x_arguments.get("statement_timeout", MIGRATION_STATEMENT_TIMEOUT)
+retries = int(x_arguments.get("retries", MIGRATION_RETRIES))
+
+# Every shard holds the same schema and is migrated in turn, `-x shard=<name>` picks a single one
+shards = [x_arguments["shard"]] if "shard" in x_arguments else list(SYNC_SHARD_URLS)
+
+# SQLSTATE raised when `lock_timeout` expires
+LOCK_NOT_AVAILABLE = "55P03"
 
 
 def run_migrations_offline() -> None:
@@ -42,16 +60,25 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
-        literal_binds=True,
-        dialect_opts={"paramstyle": "named"},
-    )
+    for shard in shards:
+        config.print_stdout(f"-- Shard {shard}")
+        context.configure(
+            url=SYNC_SHARD_URLS[shard],
+            target_metadata=target_metadata,
+            literal_binds=True,
+            dialect_opts={"paramstyle": "named"},
+            transaction_per_migration=True,
+        )
+
+        context.execute(f"SET lock_timeout = '{lock_timeout}'")
+        context.execute(f"SET statement_timeout = '{statement_timeout}'")
+
+        with context.begin_transaction():
+            context.run_migrations()
+
 
-    with context.begin_transaction():
-        context.run_migrations()
+def is_lock_timeout(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
 
 
 def run_migrations_online() -> None:
@@ -60,20 +87,50 @@ def run_migrations_online() -> None:
     In this scenario we need to create an Engine
     and associate a connection with the context.
 
+    Every migration is committed on its own and the session gets a short
+    `lock_timeout`. When a migration gives up waiting for a lock the run is
+    retried with a growing delay, already applied migrations are not rerun.
+    The failed migration is rerun from the start, steps committed by an
+    autocommit block included, see `infrastructure/db/migrations.py`.
+
     """
+    for shard in shards:
+        logger.info("Migrating shard %s", shard)
+        run_shard_migrations_online(SYNC_SHARD_URLS[shard])
+
+
+def run_shard_migrations_online(url: str) -> None:
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        url=url,
     )
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+    delay = MIGRATION_RETRY_DELAY.total_seconds()
+
+    for attempt in range(1, retries + 1):
+        try:
+            with connectable.connect() as connection:
+                connection.exec_driver_sql(f"SET lock_timeout = '{lock_timeout}'")
+                connection.exec_driver_sql(f"SET statement_timeout = '{statement_timeout}'")
+                connection.commit()
+
+                context.configure(
+                    connection=connection,
+                    target_metadata=target_metadata,
+                    transaction_per_migration=True,
+                )
+
+                with context.begin_transaction():
+                    context.run_migrations()
+            return
+        except OperationalError as exc:
+            if not is_lock_timeout(exc) or attempt == retries:
+                raise
+            logger.warning("Lock timeout on attempt %d/%d, retrying in %.0fs", attempt, retries, delay)
+            time.sleep(delay)
+            delay *= 2
 
 
 if context.is_offline_mode():
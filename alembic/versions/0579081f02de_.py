@@ -0,0 +1,35 @@
+"""restore user_auth with case-insensitive usernames
+
+Revision ID: 0579081f02de
+Revises: 084d0c007f72
+Create Date: 2026-10-18 10:12:04.518330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0579081f02de'
+down_revision: Union[str, None] = '084d0c007f72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_auth',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_auth_username_lower', 'user_auth', [sa.text('lower(username)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_auth_username_lower', table_name='user_auth')
+    op.drop_table('user_auth')
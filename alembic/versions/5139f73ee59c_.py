@@ -0,0 +1,42 @@
+"""restore soft deletion flags on user_profiles
+
+Revision ID: 5139f73ee59c
+Revises: 0579081f02de
+Create Date: 2026-10-18 11:02:47.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.users_service.infrastructure.db import migrations as m
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5139f73ee59c'
+down_revision: Union[str, None] = '0579081f02de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant defaults keep these ALTERs metadata-only, no table rewrite happens.
+    # IF NOT EXISTS: the index builds below commit them, a retried upgrade finds them applied
+    m.add_column('user_profiles', sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=False))
+    m.add_column('user_profiles', sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    m.add_column('user_profiles', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    m.create_index_concurrently('ix_user_profiles_alive', 'user_profiles', ['user_id'],
+                                postgresql_include=['language', 'is_active'], postgresql_where=sa.text('NOT is_deleted'))
+    m.create_index_concurrently('ix_user_profiles_deleted_at', 'user_profiles', ['deleted_at'],
+                                postgresql_where=sa.text('is_deleted'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    m.drop_index_concurrently('ix_user_profiles_deleted_at', 'user_profiles')
+    m.drop_index_concurrently('ix_user_profiles_alive', 'user_profiles')
+    op.drop_column('user_profiles', 'deleted_at')
+    op.drop_column('user_profiles', 'is_deleted')
+    op.drop_column('user_profiles', 'is_active')
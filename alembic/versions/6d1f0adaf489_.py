@@ -0,0 +1,28 @@
+"""add user_profiles.version for optimistic concurrency
+
+Revision ID: 6d1f0adaf489
+Revises: 5139f73ee59c
+Create Date: 2026-10-18 11:48:21.660472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1f0adaf489'
+down_revision: Union[str, None] = '5139f73ee59c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_profiles', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_profiles', 'version')
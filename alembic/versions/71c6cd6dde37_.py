@@ -0,0 +1,34 @@
+"""drop user_auth foreign key, usernames are sharded apart from their users
+
+Revision ID: 71c6cd6dde37
+Revises: 6d1f0adaf489
+Create Date: 2026-10-18 14:21:37.114052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.users_service.infrastructure.db import migrations as m
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71c6cd6dde37'
+down_revision: Union[str, None] = '6d1f0adaf489'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # user_auth rows live on the shard of their username, not necessarily the one holding the user
+    op.drop_constraint('user_auth_user_id_fkey', 'user_auth', type_='foreignkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Only valid while every username is stored next to its user, as on a single shard
+    m.create_foreign_key_not_valid('user_auth_user_id_fkey', 'user_auth', 'users', ['user_id'], ['id'],
+                                   ondelete='CASCADE')
+    m.validate_constraint('user_auth', 'user_auth_user_id_fkey')
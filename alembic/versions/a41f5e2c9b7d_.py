@@ -0,0 +1,30 @@
+"""add user_auth.created_at, orphaned username claims are released after a while
+
+Revision ID: a41f5e2c9b7d
+Revises: 71c6cd6dde37
+Create Date: 2026-10-19 09:42:18.305611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f5e2c9b7d'
+down_revision: Union[str, None] = '71c6cd6dde37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOW() is evaluated once for existing rows, the ALTER stays metadata-only
+    op.add_column('user_auth', sa.Column('created_at', sa.DateTime(),
+                                         server_default=sa.text("TIMEZONE('UTC', NOW())"), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_auth', 'created_at')
@@ -0,0 +1,27 @@
+"""index user_auth.created_at, username filters refresh from recent claims
+
+Revision ID: c3e8f1d27a90
+Revises: a41f5e2c9b7d
+Create Date: 2026-10-19 14:12:51.772430
+
+"""
+from typing import Sequence, Union
+
+from src.users_service.infrastructure.db import migrations as m
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1d27a90'
+down_revision: Union[str, None] = 'a41f5e2c9b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    m.create_index_concurrently('ix_user_auth_created_at', 'user_auth', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    m.drop_index_concurrently('ix_user_auth_created_at', 'user_auth')
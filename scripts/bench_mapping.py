@@ -0,0 +1,155 @@
+"""
+Throughput and allocations of list-heavy user reads, from the executed
+statement to the API DTOs, on an in-memory SQLite database, and of the
+lookup's input from the request body down to the query.
+
+- orm + pydantic: what reads did before, ORM entities through the session
+  (identity map included), validated into a queries DTO, merged into a flow
+  DTO and merged again into the API DTO.
+- core + slots: Core rows mapped into `domain.models.UserSummary` and
+  validated once into the API DTO.
+- core + slots, mapping only: the same without the API DTO, the cost left
+  to the internal layers.
+- input, every layer: the ids validated by the API DTO, the flow DTO and
+  the queries DTO, as lookups did before.
+- input, API edge only: validated by the API DTO, passed on with `model_construct`.
+
+    poetry run python -m scripts.bench_mapping --rows 1000
+"""
+import argparse
+import timeit
+import tracemalloc
+import uuid
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, contains_eager, load_only
+
+from src.users_service.api.dto import p as api_p, r as api_r
+from src.users_service.config.settings import USERS_LOOKUP_MAX_IDS
+from src.users_service.domain.models import enums, models as domain
+from src.users_service.infrastructure.db import models
+from src.users_service.services.flows import p as flows_p
+from src.users_service.services.queries import p as queries_p
+from src.users_service.services.queries import statements as st
+from src.users_service.utils.dto import BaseDTO, s
+
+
+# The DTO chain reads used to go through
+class QueriesProfileDTO(BaseDTO):
+    language: s.UserProfile.language
+    is_active: s.UserProfile.is_active
+    version: s.UserProfile.version
+
+
+class QueriesUserDTO(BaseDTO):
+    id: s.User.id
+    created_at: s.User.created_at
+    updated_at: s.User.updated_at
+    profile: QueriesProfileDTO
+
+
+class FlowsUserDTO(BaseDTO):
+    id: s.User.id
+    created_at: s.User.created_at
+    updated_at: s.User.updated_at
+    language: s.UserProfile.language
+    is_active: s.UserProfile.is_active
+    version: s.UserProfile.version
+
+
+ORM_SELECT = (
+    sa.select(models.User)
+    .join(models.User.profile)
+    .where(models.User.id.in_(sa.bindparam("user_ids", expanding=True)), ~models.UserProfile.is_deleted)
+    .options(
+        load_only(models.User.id, models.User.created_at, models.User.updated_at),
+        contains_eager(models.User.profile).load_only(
+            models.UserProfile.language, models.UserProfile.is_active, models.UserProfile.version),
+    )
+)
+
+
+def populate(engine: sa.Engine, rows: int) -> list[uuid.UUID]:
+    models.User.metadata.create_all(engine, tables=[st.users, st.profiles])
+    now = datetime.now()
+    user_ids = [uuid.uuid4() for _ in range(rows)]
+    with engine.begin() as connection:
+        connection.execute(st.users.insert(), [
+            {"id": user_id, "created_at": now, "updated_at": now} for user_id in user_ids])
+        connection.execute(st.profiles.insert(), [
+            {"user_id": user_id, "language": enums.UserLanguages.EN, "is_active": True, "is_deleted": False,
+             "version": 1} for user_id in user_ids])
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = sa.create_engine("sqlite://")
+    user_ids = populate(engine, args.rows)
+    params = {"user_ids": user_ids}
+
+    def orm_pydantic():
+        with Session(engine) as session:
+            users = [QueriesUserDTO.model_validate(user) for user in session.scalars(ORM_SELECT, params)]
+            flow_users = [FlowsUserDTO.v(user, user.profile) for user in users]
+            return [api_r.GetUserDTO.v(user) for user in flow_users]
+
+    def core_slots():
+        with engine.connect() as connection:
+            users = [domain.UserSummary(*row) for row in connection.execute(st.SELECT_USER_SUMMARIES, params)]
+            return [api_r.GetUserDTO.model_validate(user) for user in users]
+
+    def core_slots_mapping_only():
+        with engine.connect() as connection:
+            return [domain.UserSummary(*row) for row in connection.execute(st.SELECT_USER_SUMMARIES, params)]
+
+    print(f"{args.rows} rows per read")
+    print(f"{'case':<30}{'rows/s':>12}{'us/row':>10}{'retained KiB':>14}{'peak KiB':>11}")
+    for name, fn in [
+        ("orm + pydantic", orm_pydantic),
+        ("core + slots", core_slots),
+        ("core + slots, mapping only", core_slots_mapping_only),
+    ]:
+        assert len(fn()) == args.rows
+        per_read = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+
+        tracemalloc.start()
+        result = fn()
+        allocated, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+
+        print(f"{name:<30}{args.rows / per_read:>12.0f}{per_read / args.rows * 1_000_000:>10.2f}"
+              f"{allocated / 1024:>14.0f}{peak / 1024:>11.0f}")
+
+    # The lookup body as it comes out of JSON decoding, as long as the API accepts
+    lookup_ids = user_ids[:USERS_LOOKUP_MAX_IDS]
+    body = {"user_ids": [str(user_id) for user_id in lookup_ids]}
+
+    def input_every_layer():
+        param = api_p.LookupUsersDTO.model_validate(body)
+        flow_param = flows_p.GetUsersDTO(user_ids=param.user_ids)
+        return queries_p.users.GetManyDTO(user_ids=flow_param.user_ids)
+
+    def input_edge_only():
+        param = api_p.LookupUsersDTO.model_validate(body)
+        flow_param = flows_p.GetUsersDTO.model_construct(user_ids=param.user_ids)
+        return queries_p.users.GetManyDTO.model_construct(user_ids=flow_param.user_ids)
+
+    print(f"\n{'input case':<30}{'ids/s':>12}{'us/id':>10}")
+    for name, fn in [
+        ("input, every layer", input_every_layer),
+        ("input, API edge only", input_edge_only),
+    ]:
+        assert fn().user_ids == lookup_ids
+        per_read = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<30}{len(lookup_ids) / per_read:>12.0f}{per_read / len(lookup_ids) * 1_000_000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Goodput under overload: requests answered successfully within a client
+deadline, per second, at rising concurrency. Without admission control
+latency grows with the pool queue until every request misses the deadline,
+with it the excess is shed with 503 and the rest stays fast.
+
+    poetry run python -m scripts.bench_overload --path /users/<id> --concurrency 32 128 512
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from scripts.bench_workers import wait_until_up, percentile
+
+
+async def overload(url: str, concurrency: int, duration: float, deadline: float) -> tuple[list[float], int, int]:
+    """Returns latencies of good responses, shed (503) and late or failed response counts."""
+    good: list[float] = []
+    shed = failed = 0
+    stop = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=deadline) as client:
+        async def client_loop():
+            nonlocal shed, failed
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except httpx.HTTPError:
+                    failed += 1
+                    continue
+                if response.status_code == 503:
+                    shed += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)) / 10)
+                elif response.status_code < 500:
+                    good.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    return good, shed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/usernames/filter")
+    parser.add_argument("--port", type=int, default=8103)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[32, 128, 512])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--deadline", type=float, default=2.0, help="Client timeout in seconds")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    env = os.environ | {"WORKERS": str(args.workers), "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(args.port)}
+    server = subprocess.Popen([sys.executable, "-c", "from scripts.prod import main; main()"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(url))
+        print(f"{'clients':>8}{'goodput/s':>12}{'shed/s':>10}{'failed/s':>10}{'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            good, shed, failed = asyncio.run(overload(url, concurrency, args.duration, args.deadline))
+            print(f"{concurrency:>8}{len(good) / args.duration:>12.0f}{shed / args.duration:>10.0f}"
+                  f"{failed / args.duration:>10.0f}{percentile(good, 0.99) * 1000:>10.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
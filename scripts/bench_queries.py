@@ -0,0 +1,84 @@
+"""
+Measures the Python side cost of getting SQL ready for execution, per call,
+without a database: statement construction, cache key generation and the
+compiled cache lookup (or a full compile on a miss).
+
+    poetry run python -m scripts.bench_queries
+"""
+import timeit
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.util import LRUCache
+
+from src.users_service.infrastructure.db import models
+from src.users_service.services.queries import statements as st
+
+
+NUMBER = 20_000
+
+
+def per_call_us(fn) -> float:
+    return min(timeit.repeat(fn, number=NUMBER, repeat=5)) / NUMBER * 1_000_000
+
+
+def main():
+    dialect = asyncpg.dialect()
+    cache = LRUCache(500)
+    user_id = uuid.uuid4()
+
+    def compile_cached(statement, *keys):
+        statement._compile_w_cache(dialect=dialect, compiled_cache=cache, column_keys=list(keys))
+
+    def rebuilt_select():
+        # What the queries did before: a fresh statement on every call
+        statement = (
+            sa.select(models.UserProfile.version)
+            .where(models.UserProfile.user_id == user_id, ~models.UserProfile.is_deleted)
+        )
+        compile_cached(statement)
+
+    def prepared_select():
+        compile_cached(st.SELECT_PROFILE_VERSION, "user_id")
+
+    def uncached_select():
+        st.SELECT_PROFILE_VERSION._compile_w_cache(dialect=dialect, compiled_cache=None, column_keys=["user_id"])
+
+    def rebuilt_update():
+        profile = models.UserProfile
+        updated = (
+            sa.update(profile)
+            .where(profile.user_id == user_id, ~profile.is_deleted, profile.version == 1)
+            .values(language="EN", version=profile.version + 1)
+            .returning(profile.user_id, profile.language, profile.version)
+            .cte("updated_profile")
+        )
+        statement = (
+            sa.update(models.User)
+            .where(models.User.id == updated.c.user_id)
+            .values(updated_at=st.utc_now)
+            .returning(models.User.id, updated.c.version)
+        )
+        compile_cached(statement)
+
+    def prepared_update():
+        fields = ("language",)
+        compile_cached(st.update_profile(fields, True), *sorted(st.update_profile_params(fields, True)))
+
+    warm_up = min(timeit.repeat(lambda: st.compile_all(dialect, LRUCache(500)), number=1, repeat=5))
+    print(f"compile_all() for {len(st._all_prepared())} statements: {warm_up * 1000:.2f}ms")
+
+    print(f"{'case':<28}{'us/call':>10}")
+    for name, fn in [
+        ("select, no compiled cache", uncached_select),
+        ("select, rebuilt per call", rebuilt_select),
+        ("select, prepared", prepared_select),
+        ("update, rebuilt per call", rebuilt_update),
+        ("update, prepared", prepared_update),
+    ]:
+        print(f"{name:<28}{per_call_us(fn):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Payload size and encode/decode time of the batch and lookup payloads, JSON
+against MessagePack, the way `api/router.py` handles each of them.
+
+- json: `model_dump_json` to encode, `model_validate_json` to decode, what
+  FastAPI does for JSON bodies and responses.
+- msgpack: the response model dumped in Python mode and packed to encode,
+  unpacked and validated to decode (see `api/negotiation.py`). UUIDs go as
+  16 raw bytes, timestamps as the Timestamp extension type.
+
+    poetry run python -m scripts.bench_serialization --ids 1000
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from pydantic import TypeAdapter
+
+from src.users_service.api.dto import p, r
+from src.users_service.api.negotiation import packb, unpackb
+from src.users_service.config.settings import TIMEZONE
+from src.users_service.domain.models import enums, models as domain
+
+
+def json_codec(adapter: TypeAdapter) -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return adapter.dump_json, adapter.validate_json
+
+
+def msgpack_codec(adapter: TypeAdapter) -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return (lambda value: packb(adapter.dump_python(value)),
+            lambda content: adapter.validate_python(unpackb(content)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Aware, so both formats decode to values equal to the encoded ones
+    now = datetime.now(TIMEZONE)
+    user_ids = [uuid.uuid4() for _ in range(args.ids)]
+    users = [r.GetUserDTO.model_validate(domain.UserSummary(user_id, now, now, enums.UserLanguages.EN, True, 1))
+             for user_id in user_ids]
+
+    payloads = [
+        ("lookup request", TypeAdapter(p.LookupUsersDTO), p.LookupUsersDTO(user_ids=user_ids)),
+        ("delete request", TypeAdapter(p.DeleteUsersDTO), p.DeleteUsersDTO(user_ids=user_ids)),
+        ("lookup response", TypeAdapter(list[r.GetUserDTO]), users),
+    ]
+
+    print(f"{args.ids} ids per payload")
+    print(f"{'payload':<18}{'format':<9}{'bytes':>10}{'size %':>8}{'encode us':>11}{'decode us':>11}")
+    for name, adapter, value in payloads:
+        json_size = None
+        for format_name, codec in [("json", json_codec), ("msgpack", msgpack_codec)]:
+            encode, decode = codec(adapter)
+            content = encode(value)
+            assert decode(content) == value
+            json_size = json_size or len(content)
+
+            encode_time = min(timeit.repeat(lambda: encode(value), number=1, repeat=args.repeat))
+            decode_time = min(timeit.repeat(lambda: decode(content), number=1, repeat=args.repeat))
+
+            print(f"{name:<18}{format_name:<9}{len(content):>10}{len(content) / json_size * 100:>8.0f}"
+                  f"{encode_time * 1_000_000:>11.0f}{decode_time * 1_000_000:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Latency over the first minute after a start, where cold pool connections
+and uncompiled statements show up.
+
+Starts `scripts/prod.py`, begins the load as soon as the port accepts
+connections (or once `/health/ready` says so with `--wait-ready`) and
+prints p50/p99 per window.
+
+    poetry run python -m scripts.bench_startup --path /users/<id>
+    poetry run python -m scripts.bench_startup --path /users/<id> --wait-ready
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from scripts.bench_workers import wait_until_up, load, percentile
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not report ready in {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/usernames/filter")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--wait-ready", action="store_true", help="Start the load once /health/ready returns 200")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    env = os.environ | {"WORKERS": str(args.workers), "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(args.port)}
+    started = time.monotonic()
+    server = subprocess.Popen([sys.executable, "-c", "from scripts.prod import main; main()"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if args.wait_ready:
+            asyncio.run(wait_until_ready(f"{base}/health/ready"))
+        else:
+            asyncio.run(wait_until_up(f"{base}/health/live"))
+        print(f"accepting load {time.monotonic() - started:.2f}s after start")
+
+        print(f"{'window s':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        windows = int(args.duration / args.window)
+        for window in range(windows):
+            latencies = asyncio.run(load(f"{base}{args.path}", args.concurrency, args.window))
+            print(f"{window * args.window:>10.0f}{len(latencies) / args.window:>10.0f}"
+                  f"{percentile(latencies, 0.50) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
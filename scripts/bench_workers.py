@@ -0,0 +1,84 @@
+"""
+Throughput scaling across worker counts of the production runner.
+
+Starts `scripts/prod.py` once per worker count, drives it with a fixed
+number of concurrent keep-alive clients for a fixed time and prints
+requests per second and latency percentiles.
+
+    poetry run python -m scripts.bench_workers --workers 1 2 4 8 --path /users/<id>
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up in {timeout}s")
+
+
+async def load(url: str, concurrency: int, duration: float) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        async def client_loop():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code < 500:
+                    latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    return latencies
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--path", default="/usernames/filter")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    print(f"{'workers':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+
+    for workers in sorted(set(args.workers)):
+        env = os.environ | {"WORKERS": str(workers), "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(args.port)}
+        server = subprocess.Popen([sys.executable, "-c", "from scripts.prod import main; main()"], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_until_up(url))
+            asyncio.run(load(url, args.concurrency, 2.0))  # warm up every worker
+            latencies = asyncio.run(load(url, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"{workers:>8}{len(latencies) / args.duration:>12.0f}"
+              f"{percentile(latencies, 0.50) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
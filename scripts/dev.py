@@ -1,4 +1,8 @@
+import os
+
 import uvicorn
 
 def main():
+    # Read by the reloaded server process, an explicit DEBUG in the environment or .env wins
+    os.environ.setdefault("DEBUG", "true")
     uvicorn.run("src.users_service.main:app", host="127.0.0.1", port=8001, reload=True)
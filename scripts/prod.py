@@ -0,0 +1,36 @@
+import random
+
+import uvicorn
+from loguru import logger
+
+from src.users_service.config.settings import (
+    SERVER_HOST, SERVER_PORT, WORKERS, WORKER_MAX_REQUESTS, WORKER_MAX_REQUESTS_JITTER, DB_DRAIN_TIMEOUT,
+)
+
+
+def max_requests() -> int | None:
+    """Requests after which uvicorn replaces a worker, None when workers aren't recycled."""
+    if not WORKER_MAX_REQUESTS:
+        return None
+    if WORKERS == 1:
+        # Without worker processes nothing would replace it, the service would stop for good
+        logger.warning("WORKER_MAX_REQUESTS is ignored with a single worker, workers are not recycled")
+        return None
+    return WORKER_MAX_REQUESTS + random.randint(0, WORKER_MAX_REQUESTS_JITTER)
+
+
+def main():
+    # Workers are spawned, not forked, each one imports the app and builds its own engines
+    uvicorn.run(
+        "src.users_service.main:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=WORKERS,
+        loop="uvloop",
+        http="httptools",
+        proxy_headers=True,
+        access_log=False,
+        limit_max_requests=max_requests(),
+        # After a stop signal the listener closes and in-flight requests get this long to finish
+        timeout_graceful_shutdown=int(DB_DRAIN_TIMEOUT.total_seconds()),
+    )
@@ -0,0 +1,160 @@
+"""
+Moves rows to the shards owning them after the shard layout changes.
+
+Users and profiles belong to the shard of the user id, usernames to the
+shard of the lower-cased username (see `infrastructure/db/sharding.py`).
+With consistent hashing, adding a shard moves only the keys the new shard
+takes over, everything else stays in place.
+
+Adding a shard:
+    1. Create the database and migrate it:  alembic -x shard=s2 upgrade head
+    2. Copy rows to their new owners, the service still runs on the old layout:
+           python -m scripts.rebalance copy --shards '{"s0": "...", "s1": "...", "s2": "db2:5432/users"}'
+    3. Deploy the new POSTGRESQL_SHARDS.
+    4. Copy again to catch up with writes made in the meantime:
+           python -m scripts.rebalance copy
+    5. Delete the rows their shard no longer owns:
+           python -m scripts.rebalance prune
+
+Copying is idempotent. Users and usernames which already exist on the target
+are left alone, profiles are overwritten only by a newer version, so the
+catch-up copy doesn't undo updates made on the new owner. Activation and
+deletion changes made on the old owner between both copies are not carried
+over, keep that window short. `prune` only deletes rows which are present on
+their owner. `--dry-run` reports what would be done.
+"""
+import argparse
+import json
+import time
+from typing import Iterator
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection, Engine
+
+from src.users_service.config.settings import (
+    env, SHARD_LOCATIONS, SHARD_VIRTUAL_NODES, SHARD_REBALANCE_BATCH_SIZE,
+)
+from src.users_service.infrastructure.db import models
+from src.users_service.infrastructure.db.sharding import HashRing
+
+
+users = models.User.__table__
+profiles = models.UserProfile.__table__
+auth = models.UserAuth.__table__
+
+
+def shard_url(location: str) -> str:
+    return f"postgresql+psycopg2://{env.POSTGRESQL_USER}:{env.POSTGRESQL_PASSWORD}@{location}"
+
+
+def scan(connection: Connection, statement: sa.Select, key: sa.Column, batch_size: int) -> Iterator[list[sa.Row]]:
+    """Keyset-paginated batches of `statement` ordered by `key`."""
+    last = None
+    while True:
+        batch_statement = statement.order_by(key).limit(batch_size)
+        if last is not None:
+            batch_statement = batch_statement.where(key > last)
+        rows = connection.execute(batch_statement).all()
+        # Don't hold a snapshot open on the source for the whole scan
+        connection.rollback()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]._mapping[key.name]
+
+
+def copy_users(rows: list[sa.Row], target: Connection) -> int:
+    user_rows = [{column.name: row._mapping[column.name] for column in users.c} for row in rows]
+    profile_rows = [{column.name: row._mapping[column.name] for column in profiles.c} for row in rows]
+
+    target.execute(insert(users).on_conflict_do_nothing(index_elements=[users.c.id]), user_rows)
+    upsert = insert(profiles)
+    updated = {column.name: upsert.excluded[column.name] for column in profiles.c if column is not profiles.c.user_id}
+    target.execute(
+        upsert.on_conflict_do_update(index_elements=[profiles.c.user_id], set_=updated,
+                                     where=profiles.c.version < upsert.excluded.version),
+        profile_rows,
+    )
+    return len(rows)
+
+
+def copy_usernames(rows: list[sa.Row], target: Connection) -> int:
+    target.execute(insert(auth).on_conflict_do_nothing(), [dict(row._mapping) for row in rows])
+    return len(rows)
+
+
+def present(target: Connection, column: sa.Column, keys: list) -> set:
+    return set(target.scalars(sa.select(column).where(column.in_(keys))))
+
+
+def rebalance(mode: str, engines: dict[str, Engine], ring: HashRing, batch_size: int, dry_run: bool) -> None:
+    user_scan = sa.select(*users.c, *[column for column in profiles.c if column is not profiles.c.user_id]) \
+        .join(profiles, profiles.c.user_id == users.c.id)
+    auth_scan = sa.select(auth)
+
+    for source_name, source_engine in engines.items():
+        started = time.monotonic()
+        counts = {"scanned": 0, "misplaced": 0, "moved": 0, "skipped": 0}
+
+        with source_engine.connect() as source:
+            for kind, statement, key, owner_of in [
+                ("users", user_scan, users.c.id, lambda row: ring.shard_for(row.id)),
+                ("usernames", auth_scan, auth.c.user_id, lambda row: ring.shard_for(row.username.lower())),
+            ]:
+                for rows in scan(source, statement, key, batch_size):
+                    counts["scanned"] += len(rows)
+                    misplaced: dict[str, list[sa.Row]] = {}
+                    for row in rows:
+                        owner = owner_of(row)
+                        if owner != source_name:
+                            misplaced.setdefault(owner, []).append(row)
+
+                    for owner, owned_rows in misplaced.items():
+                        counts["misplaced"] += len(owned_rows)
+                        if dry_run:
+                            continue
+
+                        if mode == "copy":
+                            copy = copy_users if kind == "users" else copy_usernames
+                            with engines[owner].begin() as target:
+                                counts["moved"] += copy(owned_rows, target)
+                            continue
+
+                        keys = [row._mapping[key.name] for row in owned_rows]
+                        with engines[owner].connect() as target:
+                            copied = list(present(target, key, keys))
+                        counts["skipped"] += len(keys) - len(copied)
+                        if copied:
+                            # Profiles go with their users through ON DELETE CASCADE
+                            table = users if kind == "users" else auth
+                            with source_engine.begin() as deleting:
+                                counts["moved"] += deleting.execute(
+                                    sa.delete(table).where(key.in_(copied))).rowcount
+
+        print(f"{source_name}: {counts} in {time.monotonic() - started:.1f}s")
+        if counts["skipped"]:
+            print(f"{source_name}: {counts['skipped']} rows are missing on their owner, run `copy` before `prune`")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["copy", "prune"])
+    parser.add_argument("--shards", type=json.loads, default=None,
+                        help="Target layout as in POSTGRESQL_SHARDS, defaults to the configured one")
+    parser.add_argument("--batch-size", type=int, default=SHARD_REBALANCE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    layout = args.shards or SHARD_LOCATIONS
+    # Shards dropped from the layout are still read from, their rows have to move off them
+    locations = SHARD_LOCATIONS | layout
+    engines = {name: sa.create_engine(shard_url(location), poolclass=sa.NullPool)
+               for name, location in locations.items()}
+    ring = HashRing(layout, SHARD_VIRTUAL_NODES)
+
+    rebalance(args.mode, engines, ring, args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
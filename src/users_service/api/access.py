@@ -0,0 +1,13 @@
+"""
+Access to debug features, shared by the debug router and the middlewares.
+"""
+import secrets
+
+from src.users_service.config.settings import DEBUG, DEBUG_TOKEN
+
+
+def has_debug_access(x_debug_token: str | None) -> bool:
+    """Debug features are open in DEBUG mode, otherwise they need `X-Debug-Token`."""
+    if DEBUG:
+        return True
+    return DEBUG_TOKEN is not None and secrets.compare_digest(x_debug_token or "", DEBUG_TOKEN)
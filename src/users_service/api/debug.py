@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from src.users_service.infrastructure.admission import admission
+from src.users_service.infrastructure.db.instrumentation import sql_instrumentation
+from src.users_service.infrastructure.profiling import request_profiler
+from src.users_service.infrastructure.watchdog import loop_watchdog
+from .access import has_debug_access
+from .dto import r
+
+
+async def require_debug_access(x_debug_token: str | None = Header(None)) -> None:
+    if not has_debug_access(x_debug_token):
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_debug_access)])
+
+
+@router.get("/sql")
+async def sql_stats() -> list[r.SQLStatsDTO]:
+    return [r.SQLStatsDTO.model_validate(stats) for stats in sql_instrumentation.stats()]
+
+
+@router.get("/sql/cache")
+async def sql_cache() -> r.SQLCacheDTO:
+    return r.SQLCacheDTO.model_validate(sql_instrumentation.cache_report())
+
+
+@router.delete("/sql", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_sql_stats() -> None:
+    sql_instrumentation.reset()
+
+
+@router.get("/admission")
+async def admission_stats() -> r.AdmissionStatsDTO:
+    return r.AdmissionStatsDTO.model_validate(admission.stats())
+
+
+@router.get("/loop")
+async def loop_lag() -> r.LoopLagDTO:
+    """Cumulative histogram of event loop lag, bucket bounds in milliseconds."""
+    return r.LoopLagDTO.model_validate(loop_watchdog.stats())
+
+
+@router.get("/profiles")
+async def profiles() -> list[r.SavedProfileDTO]:
+    return [r.SavedProfileDTO.model_validate(profile) for profile in request_profiler.saved()]
+
+
+@router.get("/profiles/{name}", response_class=FileResponse)
+async def download_profile(name: str) -> FileResponse:
+    path = request_profiler.path(name)
+    if path is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
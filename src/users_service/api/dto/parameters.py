@@ -1,5 +1,31 @@
+from typing import Annotated, Self
+
+from pydantic import Field, model_validator
+
+from src.users_service.config.settings import SOFT_DELETE_MAX_IDS, USERS_LOOKUP_MAX_IDS
 from src.users_service.utils.dto import BaseDTO, s
 
 
 class CreateDTO(BaseDTO):
     language: s.UserProfile.language
+    username: s.UserAuth.username | None = None
+
+
+class DeleteUsersDTO(BaseDTO):
+    user_ids: Annotated[list[s.User.id], Field(min_length=1, max_length=SOFT_DELETE_MAX_IDS)]
+
+
+class UpdateProfileDTO(BaseDTO):
+    """Fields left out of the request body are not touched."""
+    language: s.UserProfile.language
+
+    @model_validator(mode="after")
+    def _not_empty(self) -> Self:
+        # An empty body would only bump the version, defaults are never written
+        if not self.model_fields_set:
+            raise ValueError("At least one field must be set")
+        return self
+
+
+class LookupUsersDTO(BaseDTO):
+    user_ids: Annotated[list[s.User.id], Field(min_length=1, max_length=USERS_LOOKUP_MAX_IDS)]
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from src.users_service.utils.dto import BaseDTO, s
 
 
@@ -6,4 +8,85 @@ class CreateDTO(BaseDTO):
     created_at: s.User.created_at
     updated_at: s.User.updated_at
     language: s.UserProfile.language
-    
\ No newline at end of file
+    username: s.UserAuth.username | None = None
+
+
+class UsernameAvailabilityDTO(BaseDTO):
+    username: s.UserAuth.username
+    available: bool
+
+
+class UsernameFilterStatsDTO(BaseDTO):
+    ready: bool
+    count: int | None = None
+    capacity: int | None = None
+    hash_count: int | None = None
+    memory_bytes: int | None = None
+    false_positive_rate: float | None = None
+
+
+class DeleteUsersDTO(BaseDTO):
+    deleted: int
+
+
+class UpdateProfileDTO(BaseDTO):
+    id: s.User.id
+    created_at: s.User.created_at
+    updated_at: s.User.updated_at
+    language: s.UserProfile.language
+    version: s.UserProfile.version
+
+
+class SQLStatsDTO(BaseDTO):
+    fingerprint: str
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow: int
+    cache_hit_ratio: float
+
+
+class SQLCacheDTO(BaseDTO):
+    executions: int
+    cache_hits: int
+    cache_misses: int
+    cache_hit_ratio: float
+
+
+class GetUserDTO(BaseDTO):
+    id: s.User.id
+    created_at: s.User.created_at
+    updated_at: s.User.updated_at
+    language: s.UserProfile.language
+    is_active: s.UserProfile.is_active
+    version: s.UserProfile.version
+
+
+class HealthDTO(BaseDTO):
+    ok: bool
+
+
+class AdmissionStatsDTO(BaseDTO):
+    limit: int
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+    timed_out: int
+
+
+class SavedProfileDTO(BaseDTO):
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+
+class LoopLagDTO(BaseDTO):
+    count: int
+    mean_ms: float
+    max_ms: float
+    stalls: int
+    reported: int
+    buckets: dict[str, int]
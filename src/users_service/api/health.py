@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response, status
+
+from src.users_service.infrastructure.db.lifecycle import db_lifecycle
+from .dto import r
+
+
+router = APIRouter(prefix="/health")
+
+
+@router.get("/live")
+async def live() -> r.HealthDTO:
+    return r.HealthDTO(ok=True)
+
+
+@router.get("/ready")
+async def ready(response: Response) -> r.HealthDTO:
+    """Ready once the connection pool is warm, not ready again while draining."""
+    if not db_lifecycle.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return r.HealthDTO(ok=db_lifecycle.ready)
@@ -0,0 +1,111 @@
+"""
+Plain ASGI middlewares. They wrap the application directly instead of going
+through `BaseHTTPMiddleware`, which keeps them cheap on every request.
+"""
+import re
+from time import perf_counter
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.users_service.infrastructure.admission import AdmissionController
+from src.users_service.infrastructure.db.instrumentation import sql_instrumentation
+from src.users_service.infrastructure.profiling import RequestProfiler
+from .access import has_debug_access
+
+
+class SQLTrackingMiddleware:
+    """Counts the SQL issued by each HTTP request to report N+1 patterns."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with sql_instrumentation.track_request(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+class AdmissionMiddleware:
+    """
+    Runs requests through the admission controller and sheds the ones it
+    rejects with 503 and `Retry-After`. Priorities come from the first
+    `(method, path pattern, priority)` rule matching the request, `*`
+    matching any method. Paths starting with an `exempt` prefix skip it.
+    """
+
+    def __init__(self, app: ASGIApp,
+                 controller: AdmissionController,
+                 priorities: list[tuple[str, str, int]],
+                 default_priority: int,
+                 exempt: tuple[str, ...] = (),
+                 retry_after: int = 1):
+        self.app = app
+        self.controller = controller
+        self.priorities = [(method, re.compile(pattern), priority) for method, pattern, priority in priorities]
+        self.default_priority: int = default_priority
+        self.exempt: tuple[str, ...] = exempt
+        self.retry_after: int = retry_after
+
+    def _priority(self, method: str, path: str) -> int:
+        for rule_method, pattern, priority in self.priorities:
+            if rule_method in ("*", method) and pattern.match(path):
+                return priority
+        return self.default_priority
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            return await self.app(scope, receive, send)
+
+        if not await self.controller.acquire(self._priority(scope["method"], scope["path"])):
+            response = PlainTextResponse("Overloaded", status_code=503,
+                                         headers={"Retry-After": str(self.retry_after)})
+            return await response(scope, receive, send)
+
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(perf_counter() - started)
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under cProfile when it is sent with `X-Profile: 1` by a
+    caller with debug access, or when it is sampled. The profile name is
+    returned in `X-Profile-Id`, the file is at `/debug/profiles/{name}`.
+    Other requests only pay for a header lookup and the sampling draw.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    def _requested(self, scope: Scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1":
+            return False
+        token = headers.get(b"x-debug-token")
+        return has_debug_access(token.decode("latin-1") if token is not None else None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self._requested(scope) or self.profiler.sampled()):
+            return await self.app(scope, receive, send)
+
+        profile = self.profiler.start()
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        name = self.profiler.name(scope["method"], scope["path"])
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", name.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            await self.profiler.save(profile, name)
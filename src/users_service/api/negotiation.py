@@ -0,0 +1,169 @@
+"""
+MessagePack content negotiation, JSON staying the default.
+
+Routes built by `MsgPackRoute`:
+- accept request bodies sent as `Content-Type: application/msgpack`,
+- answer with `application/msgpack` when the `Accept` header asks for it.
+
+UUIDs are packed as their raw 16 bytes and datetimes as the msgpack
+Timestamp extension type (naive ones are taken as `TIMEZONE`), which skips
+formatting and parsing them as strings on both ends. Other services decode
+responses with `msgpack.unpackb(content, timestamp=3)` and `UUID(bytes=...)`.
+Errors are always sent as JSON.
+
+Usage:
+    router = APIRouter(route_class=MsgPackRoute)
+"""
+from contextvars import ContextVar
+from datetime import datetime
+from enum import Enum
+from functools import wraps
+from typing import Any, Callable, Coroutine
+from uuid import UUID
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from src.users_service.config.settings import TIMEZONE
+
+
+MSGPACK = "application/msgpack"
+
+_accepts_msgpack: ContextVar[bool] = ContextVar("accepts_msgpack", default=False)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return value.bytes
+    if isinstance(value, datetime):
+        return msgpack.Timestamp.from_datetime(value if value.tzinfo else value.replace(tzinfo=TIMEZONE))
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default, datetime=True)
+
+
+def unpackb(content: bytes) -> Any:
+    return msgpack.unpackb(content, timestamp=3)
+
+
+def _is_msgpack(content_type: str | None) -> bool:
+    if content_type is None:
+        return False
+    return content_type.split(";", 1)[0].strip().lower() in (MSGPACK, "application/x-msgpack")
+
+
+def _accepts(accept: str | None) -> bool:
+    """
+    True when `Accept` ranks msgpack at least as high as JSON or a wildcard.
+    JSON stays the answer to `*/*` alone and to a missing header.
+    """
+    if not accept:
+        return False
+
+    msgpack_quality = other_quality = 0.0
+    for media_range in accept.split(","):
+        media_type, _, parameters = media_range.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if _is_msgpack(media_type):
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type.strip().lower() in ("application/json", "application/*", "*/*"):
+            other_quality = max(other_quality, quality)
+
+    return msgpack_quality > 0 and msgpack_quality >= other_quality
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+
+class MsgPackRequest(Request):
+    """
+    A msgpack request presented to FastAPI as JSON: the content type is
+    rewritten so the body goes through `json()`, which decodes msgpack.
+    """
+
+    def __init__(self, request: Request):
+        headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+        headers.append((b"content-type", b"application/json"))
+        super().__init__({**request.scope, "headers": headers}, request.receive)
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+
+class MsgPackRoute(APIRoute):
+    """
+    Content negotiation happens around FastAPI's own request handling. For a
+    msgpack response the endpoint result is dumped by the response model in
+    Python mode and packed directly, so it never goes through JSON encoding.
+    Headers and status code set on an injected `Response` are carried over.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Coroutine[Any, Any, Any]], **kwargs: Any):
+        super().__init__(path, self._negotiated(endpoint), **kwargs)
+        self._response_adapter: TypeAdapter | None = (
+            None if self.response_model is None else TypeAdapter(self.response_model)
+        )
+
+    def _negotiated(self, endpoint: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
+        @wraps(endpoint)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = await endpoint(*args, **kwargs)
+            if not _accepts_msgpack.get() or result is None or isinstance(result, Response):
+                return result
+            return self._msgpack_response(result, kwargs)
+        return wrapper
+
+    def _msgpack_response(self, result: Any, kwargs: dict[str, Any]) -> MsgPackResponse:
+        if self._response_adapter is not None:
+            result = self._response_adapter.dump_python(
+                self._response_adapter.validate_python(result, from_attributes=True),
+                by_alias=self.response_model_by_alias,
+                exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults,
+                exclude_none=self.response_model_exclude_none,
+            )
+        response = MsgPackResponse(result, status_code=self.status_code or 200)
+
+        sub_response = next((value for value in kwargs.values() if isinstance(value, Response)), None)
+        if sub_response is not None:
+            if sub_response.status_code:
+                response.status_code = sub_response.status_code
+            response.raw_headers.extend(
+                header for header in sub_response.raw_headers if header[0] != b"content-length")
+        return response
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            token = _accepts_msgpack.set(_accepts(request.headers.get("accept")))
+            try:
+                if _is_msgpack(request.headers.get("content-type")):
+                    request = MsgPackRequest(request)
+                response = await handler(request)
+            finally:
+                _accepts_msgpack.reset(token)
+            # JSON and msgpack answers share the URL, caches must key them on `Accept`
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return route_handler
@@ -1,19 +1,132 @@
-from fastapi import APIRouter, Depends
+from uuid import UUID
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+
+from src.users_service.domain import exceptions
 from src.users_service.services import flows
+from src.users_service.utils.dto import s
 from .dto import p, r
+from .negotiation import MsgPackRoute
 
 from src.users_service.services.dependencies import db
 
 
-router = APIRouter()
+router = APIRouter(route_class=MsgPackRoute)
 
 
 @router.post("/create")
 async def create(param: p.CreateDTO,
-                 session = Depends(db.session)) -> r.CreateDTO:
-    
-    created_user = await flows.create_user(
-        flows.p.CreateUserDTO(language=param.language), session)
-    
-    return r.CreateDTO.v(created_user)
+                 shards = Depends(db.shards)) -> r.CreateDTO:
+
+    try:
+        created_user = await flows.create_user(
+            flows.p.CreateUserDTO(language=param.language, username=param.username), shards)
+    except exceptions.UsernameTakenError:
+        raise HTTPException(status.HTTP_409_CONFLICT, "Username is already taken")
+
+    return r.CreateDTO.model_validate(created_user)
+
+
+@router.get("/users/{user_id}")
+async def get(user_id: s.User.id,
+              session = Depends(db.user_session)) -> r.GetUserDTO:
+
+    try:
+        user = await flows.get_user(flows.p.GetUserDTO(user_id=user_id), session)
+    except exceptions.UserNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+
+    return r.GetUserDTO.model_validate(user)
+
+
+@router.post("/users/lookup")
+async def lookup(param: p.LookupUsersDTO,
+                 shards = Depends(db.shards)) -> list[r.GetUserDTO]:
+
+    # Up to USERS_LOOKUP_MAX_IDS ids, validated once above and passed on as they are
+    users = await flows.get_users(flows.p.GetUsersDTO.model_construct(user_ids=param.user_ids), shards)
+
+    return [r.GetUserDTO.model_validate(user) for user in users]
+
+
+@router.get("/usernames/filter")
+async def username_filter_stats() -> r.UsernameFilterStatsDTO:
+    return r.UsernameFilterStatsDTO.model_validate(flows.get_username_filter_stats())
+
+
+@router.get("/usernames/{username}/availability")
+async def username_availability(username: s.UserAuth.username,
+                                session = Depends(db.username_session)) -> r.UsernameAvailabilityDTO:
+
+    availability = await flows.check_username(
+        flows.p.UsernameAvailabilityDTO(username=username), session)
+
+    return r.UsernameAvailabilityDTO.model_validate(availability)
+
+
+async def _set_active(user_id: UUID, is_active: bool, session) -> None:
+    try:
+        await flows.set_user_active(flows.p.SetUserActiveDTO(user_id=user_id, is_active=is_active), session)
+    except exceptions.UserNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+
+
+@router.post("/users/{user_id}/deactivate", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate(user_id: s.User.id,
+                     session = Depends(db.user_session)) -> None:
+    await _set_active(user_id, False, session)
+
+
+@router.post("/users/{user_id}/activate", status_code=status.HTTP_204_NO_CONTENT)
+async def activate(user_id: s.User.id,
+                   session = Depends(db.user_session)) -> None:
+    await _set_active(user_id, True, session)
+
+
+@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete(user_id: s.User.id,
+                 session = Depends(db.user_session)) -> None:
+    try:
+        await flows.delete_user(flows.p.DeleteUserDTO(user_id=user_id), session)
+    except exceptions.UserNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+
+
+@router.post("/users/delete")
+async def delete_many(param: p.DeleteUsersDTO,
+                      shards = Depends(db.shards)) -> r.DeleteUsersDTO:
+
+    deleted = await flows.delete_users(flows.p.DeleteUsersDTO(user_ids=param.user_ids), shards)
+
+    return r.DeleteUsersDTO(deleted=deleted)
+
+
+def _parse_if_match(if_match: str | None) -> int | None:
+    """Reads the profile version out of an `If-Match` header, `*` matches any version."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid If-Match header")
+
+
+@router.patch("/users/{user_id}/profile")
+async def update_profile(user_id: s.User.id,
+                         param: p.UpdateProfileDTO,
+                         response: Response,
+                         if_match: str | None = Header(None),
+                         session = Depends(db.user_session)) -> r.UpdateProfileDTO:
+
+    try:
+        updated = await flows.update_profile(
+            flows.p.UpdateProfileDTO(user_id=user_id, expected_version=_parse_if_match(if_match),
+                                     **param.model_dump(exclude_unset=True)), session)
+    except exceptions.UserNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+    except exceptions.VersionConflictError as exc:
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, "Profile was modified",
+                            headers={"ETag": f'"{exc.current_version}"'})
+
+    response.headers["ETag"] = f'"{updated.version}"'
+    return r.UpdateProfileDTO.model_validate(updated)
@@ -1,12 +1,11 @@
 from datetime import timezone, timedelta
 from pathlib import Path
+import os
 import sys
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-DEBUG = True
-
 TIMEZONE: timezone = timezone.utc
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
@@ -22,6 +21,9 @@ class Env(BaseSettings):
     POSTGRESQL_HOST: str
     POSTGRESQL_PORT: int
     POSTGRESQL_DATABASE: str
+    # Shard name -> "host:port/database", credentials are shared. Unset, the database above is the only shard.
+    # Names place shards on the hash ring, keep them when adding shards: '{"s0": "db0:5432/users", ...}'
+    POSTGRESQL_SHARDS: dict[str, str] = {}
 
     # ---------------------------------------------
     # Jwt authentication
@@ -31,6 +33,25 @@ class Env(BaseSettings):
     JWT_TOKEN: str
     JWT_ISS: str
 
+    # ---------------------------------------------
+    # Production server
+    # ---------------------------------------------
+
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8001
+    WORKERS: int | None = None  # Defaults to the number of cores
+    WORKER_MAX_REQUESTS: int = 0  # Recycle a worker after this many requests, 0 disables it. Needs WORKERS > 1
+    WORKER_MAX_REQUESTS_JITTER: int = 0  # Random extra requests drawn per server, so replicas don't recycle together
+
+    # ---------------------------------------------
+    # Debug endpoints
+    # ---------------------------------------------
+
+    # Debug logging, and /debug endpoints and `X-Profile` open to anyone. Development only.
+    DEBUG: bool = False
+    # Required in the `X-Debug-Token` header to reach /debug endpoints and `X-Profile` outside DEBUG mode
+    DEBUG_TOKEN: str | None = None
+
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ".env"
     )
@@ -38,11 +59,71 @@ class Env(BaseSettings):
 
 env = Env()
 
+DEBUG = env.DEBUG
+
 
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{env.POSTGRESQL_USER}:{env.POSTGRESQL_PASSWORD}@{env.POSTGRESQL_HOST}:{env.POSTGRESQL_PORT}/{env.POSTGRESQL_DATABASE}"
 SYNC_DATABASE_URL = f"postgresql+psycopg2://{env.POSTGRESQL_USER}:{env.POSTGRESQL_PASSWORD}@{env.POSTGRESQL_HOST}:{env.POSTGRESQL_PORT}/{env.POSTGRESQL_DATABASE}"
 
 
+# ------------------------
+# Sharding
+# ------------------------
+# Users are spread over the shards by a consistent hash of their id, see infrastructure/db/sharding.py
+
+SHARD_LOCATIONS = env.POSTGRESQL_SHARDS or {
+    "default": f"{env.POSTGRESQL_HOST}:{env.POSTGRESQL_PORT}/{env.POSTGRESQL_DATABASE}",
+}
+ASYNC_SHARD_URLS = {
+    name: f"postgresql+asyncpg://{env.POSTGRESQL_USER}:{env.POSTGRESQL_PASSWORD}@{location}"
+    for name, location in SHARD_LOCATIONS.items()
+}
+SYNC_SHARD_URLS = {
+    name: f"postgresql+psycopg2://{env.POSTGRESQL_USER}:{env.POSTGRESQL_PASSWORD}@{location}"
+    for name, location in SHARD_LOCATIONS.items()
+}
+SHARD_VIRTUAL_NODES = 256  # Points per shard on the ring, more spread keys more evenly
+SHARD_REBALANCE_BATCH_SIZE = 1_000
+
+# Pool settings are per shard, every shard engine has its own pool. A request holds at most one connection
+# per shard (see ShardSessions), so each database sees up to WORKERS * DB_SHARD_CONNECTIONS connections
+# whatever the number of shards, while a worker holds up to DB_SHARD_CONNECTIONS on every shard.
+
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 10
+DB_SHARD_CONNECTIONS = DB_POOL_SIZE + DB_MAX_OVERFLOW
+DB_POOL_TIMEOUT = 5  # Admission control keeps requests out of the pool queue, this only backs it up
+DB_POOL_RECYCLE = 1800
+
+DB_WARM_UP_CONNECTIONS = 10  # Per shard, opened in parallel on startup, at most DB_POOL_SIZE stay pooled
+DB_WARM_UP_RETRY_INTERVAL = timedelta(seconds=5)  # The worker isn't ready until every shard warmed up
+DB_DRAIN_TIMEOUT = timedelta(seconds=20)  # Graceful shutdown, in-flight requests and sessions get this long
+
+
+# ------------------------
+# Admission control
+# ------------------------
+# Concurrent requests are limited to DB_SHARD_CONNECTIONS, see infrastructure/admission.py. As a request holds
+# at most one connection per shard, no shard's pool is oversubscribed however requests spread over shards.
+
+ADMISSION_CONTROL = True
+ADMISSION_MAX_QUEUE = 50
+ADMISSION_QUEUE_TIMEOUT = timedelta(seconds=1)  # Queued longer than this, the caller is better off retrying
+ADMISSION_RETRY_AFTER = 1  # Seconds, sent with 503 responses
+ADMISSION_ADAPTIVE = False  # Lower the limit when latency exceeds ADMISSION_LATENCY_TARGET
+ADMISSION_MIN_LIMIT = 4
+ADMISSION_LATENCY_TARGET = timedelta(milliseconds=250)
+ADMISSION_DEFAULT_PRIORITY = 1
+# (method, path pattern, priority), first match wins, lower priorities are admitted first
+ADMISSION_ROUTE_PRIORITIES = [
+    ("GET", r"^/users/[^/]+$", 0),
+    ("GET", r"^/usernames/", 0),
+    ("POST", r"^/users/delete$", 2),
+    ("*", r"^/debug/", 2),
+]
+ADMISSION_EXEMPT_PATHS = ("/health",)
+
+
 # ------------------------
 # Logging Configuration
 # ------------------------
@@ -84,3 +165,97 @@ JWT_TOKEN = env.JWT_TOKEN
 JWT_ALGORITHM = env.JWT_ALGORITHM
 JWT_EXP = timedelta(minutes=15)
 JWT_ISS = env.JWT_ISS
+
+
+# ------------------------
+# Username availability filter
+# ------------------------
+
+USERNAME_FILTER_ERROR_RATE = 0.001
+USERNAME_FILTER_MIN_CAPACITY = 100_000
+USERNAME_FILTER_GROWTH = 2  # Filter is sized for `GROWTH` times the current usernames count
+USERNAME_FILTER_SCAN_BATCH = 10_000
+USERNAME_FILTER_REBUILD_INTERVAL = timedelta(minutes=30)  # Full rebuild, keeps the filter sized and exact
+# Claims made through other workers and replicas are picked up this often, meanwhile they read as available
+USERNAME_FILTER_REFRESH_INTERVAL = timedelta(seconds=5)
+# Claims are stamped with their transaction's start time and may commit later, each refresh looks back this far
+USERNAME_FILTER_REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+# ------------------------
+# User reads
+# ------------------------
+
+USERS_LOOKUP_MAX_IDS = 1_000  # Ids accepted by a single lookup request
+
+
+# ------------------------
+# Soft deletion
+# ------------------------
+
+SOFT_DELETE_BATCH_SIZE = 500  # Rows updated per transaction by bulk deletes
+SOFT_DELETE_MAX_IDS = 10_000  # Ids accepted by a single bulk delete request
+PURGE_RETENTION = timedelta(days=30)  # Soft-deleted users older than this are removed for good
+PURGE_BATCH_SIZE = 1_000
+PURGE_BATCH_PAUSE = timedelta(milliseconds=100)
+PURGE_INTERVAL = timedelta(hours=1)
+# Usernames claimed this long ago without a user are released by the purge job, see flows.create_user
+ORPHANED_CLAIM_AGE = timedelta(minutes=10)
+
+
+# ------------------------
+# Migrations
+# ------------------------
+# Overridable per run: alembic -x lock_timeout=10s -x statement_timeout=0 -x retries=3 upgrade head
+
+MIGRATION_LOCK_TIMEOUT = "5s"  # Fail fast instead of queueing live queries behind a waiting ALTER
+MIGRATION_STATEMENT_TIMEOUT = "0"  # Disabled, concurrent index builds may take long
+MIGRATION_RETRIES = 5
+MIGRATION_RETRY_DELAY = timedelta(seconds=2)  # Doubled after every failed attempt
+
+
+# ------------------------
+# SQL instrumentation
+# ------------------------
+
+SQL_INSTRUMENTATION = True
+SQL_SLOW_QUERY_THRESHOLD = timedelta(milliseconds=200)
+SQL_EXPLAIN_SAMPLE_RATE = 0.0  # EXPLAIN ANALYZE executes the SELECT again, keep it low in production
+SQL_N_PLUS_ONE_THRESHOLD = 5  # Same statement or lazy load repeated this often in one request
+SQL_STATS_MAX_FINGERPRINTS = 1_000
+
+DEBUG_TOKEN = env.DEBUG_TOKEN
+
+
+# ------------------------
+# Event loop watchdog
+# ------------------------
+# Loop lag histogram at /debug/loop, stacks of stalls are logged, see infrastructure/watchdog.py
+
+LOOP_WATCHDOG = True
+LOOP_WATCHDOG_INTERVAL = timedelta(milliseconds=50)
+LOOP_STALL_THRESHOLD = timedelta(milliseconds=100)  # Blocked longer than this, the loop's stack is logged
+LOOP_STALL_LOG_INTERVAL = timedelta(seconds=10)
+LOOP_LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# ------------------------
+# Request profiling
+# ------------------------
+# Requests sent with `X-Profile: 1` and debug access (see api/debug.py), or sampled, run under cProfile.
+# Their profiles are listed at /debug/profiles, see infrastructure/profiling.py
+
+PROFILING = True  # Disabled, the middleware isn't installed at all
+PROFILING_SAMPLE_RATE = 0.0  # Every profiled request slows down its worker, keep it low in production
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_FILES = 50
+
+
+# ------------------------
+# Production server
+# ------------------------
+
+SERVER_HOST = env.SERVER_HOST
+SERVER_PORT = env.SERVER_PORT
+WORKERS = env.WORKERS or os.cpu_count() or 1
+WORKER_MAX_REQUESTS = env.WORKER_MAX_REQUESTS
+WORKER_MAX_REQUESTS_JITTER = env.WORKER_MAX_REQUESTS_JITTER
@@ -0,0 +1,18 @@
+class DomainError(Exception):
+    """Base class for errors raised by the service logic."""
+
+
+class UsernameTakenError(DomainError):
+    """The username is already used by another user (case-insensitive)."""
+
+
+class UserNotFoundError(DomainError):
+    """No live (not soft-deleted) user with the given id."""
+
+
+class VersionConflictError(DomainError):
+    """The resource was modified since the version the caller expected."""
+
+    def __init__(self, current_version: int):
+        super().__init__(current_version)
+        self.current_version = current_version
@@ -1,3 +1,11 @@
+"""
+Domain models passed between queries and flows.
+
+Plain slotted dataclasses: queries build them straight from Core rows, with
+no ORM identity map and no validation, and Pydantic only comes in at the API
+edge. Read models are filled positionally, so the statements producing them
+select their columns in field order (see `services/queries/statements.py`).
+"""
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
@@ -6,16 +14,42 @@ from uuid import UUID
 from src.users_service.domain.models import enums
 
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     user_id: UUID
     language: enums.UserLanguages = enums.UserLanguages.EN
     is_active: bool = True
     is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    version: int = 1
+
+
+@dataclass(slots=True)
+class UserAuth:
+    user_id: UUID
+    username: str
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: UUID
     created_at: datetime
     updated_at: datetime
+
+
+@dataclass(slots=True)
+class UserSummary:
+    """A live user with its profile, what every user read returns."""
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+    language: enums.UserLanguages
+    is_active: bool
+    version: int
+    username: Optional[str] = None
+
+
+@dataclass(slots=True)
+class UsernameAvailability:
+    username: str
+    available: bool
@@ -0,0 +1,190 @@
+"""
+Admission control in front of the connection pool.
+
+At most `limit` requests run at once, the limit starting at the capacity
+of one shard's pool. A request holds at most one connection per shard, so
+even if every admitted request hits the same shard, requests never queue
+inside a pool where they would wait for up to `pool_timeout`. Requests
+past the limit wait in a short queue ordered by priority (lower first).
+Once the queue is full, a request either displaces a queued one of lower
+priority or is rejected right away, and queued requests give up after
+`queue_timeout`. Rejecting early keeps the work that is admitted fast
+instead of letting every request time out.
+
+With `adaptive` set, the limit follows observed latency (AIMD): it grows by
+one per `limit` requests completed under `latency_target`, and shrinks by
+`backoff` at most once per `latency_target` while completions are slower.
+
+Usage:
+    if not await admission.acquire(priority):
+        ...  # reject
+    started = perf_counter()
+    try:
+        ...
+    finally:
+        admission.release(perf_counter() - started)
+"""
+import asyncio
+import heapq
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import count
+from time import monotonic
+
+from loguru import logger
+
+from src.users_service.config.settings import (
+    DB_SHARD_CONNECTIONS,
+    ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT, ADMISSION_ADAPTIVE, ADMISSION_MIN_LIMIT,
+    ADMISSION_LATENCY_TARGET,
+)
+
+
+@dataclass(order=True, slots=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Attributes:
+        limit (float): Current concurrency limit, fractional while adapting.
+        min_limit (int): The adaptive limit never goes below it.
+        max_limit (int): The adaptive limit never goes above it.
+        max_queue (int): Requests allowed to wait for a slot.
+        queue_timeout (float): Seconds a queued request waits before it is rejected.
+        adaptive (bool): Whether the limit follows latency.
+        latency_target (float): Seconds, completions slower than it shrink the limit.
+        backoff (float): Multiplier applied to the limit on a slow completion.
+    """
+
+    def __init__(self,
+                 limit: int,
+                 max_queue: int,
+                 queue_timeout: timedelta,
+                 adaptive: bool = False,
+                 min_limit: int = 1,
+                 max_limit: int | None = None,
+                 latency_target: timedelta = timedelta(milliseconds=250),
+                 backoff: float = 0.9):
+        self.limit: float = float(limit)
+        self.min_limit: int = min_limit
+        self.max_limit: int = max_limit or limit
+        self.max_queue: int = max_queue
+        self.queue_timeout: float = queue_timeout.total_seconds()
+        self.adaptive: bool = adaptive
+        self.latency_target: float = latency_target.total_seconds()
+        self.backoff: float = backoff
+
+        self.in_flight: int = 0
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.timed_out: int = 0
+        self._queue: list[_Waiter] = []
+        self._seq = count()
+        self._last_backoff: float = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self, priority: int = 0) -> bool:
+        """
+        Waits for a slot, returns False when the request should be rejected.
+        A True result must be paired with `release()`.
+        """
+        if self._has_slot() and not self._queue:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if len(self._queue) >= self.max_queue:
+            # Displace the lowest priority waiter if this request is more important
+            lowest = max(self._queue) if self._queue else None
+            if lowest is None or lowest.priority <= priority:
+                self.rejected += 1
+                return False
+            self._queue.remove(lowest)
+            heapq.heapify(self._queue)
+            lowest.future.set_result(False)
+
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+
+        try:
+            admitted = await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            admitted = self._abandon(waiter)
+            if not admitted:
+                self.timed_out += 1
+                return False
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+        if admitted:
+            self.admitted += 1
+        else:
+            self.rejected += 1
+        return admitted
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Leaves the queue, returns True if the slot was granted in the meantime."""
+        if waiter.future.done():
+            return waiter.future.result()
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        waiter.future.cancel()
+        return False
+
+    def release(self, latency: float | None = None) -> None:
+        self.in_flight -= 1
+        if self.adaptive and latency is not None:
+            self._adapt(latency)
+
+        while self._queue and self._has_slot():
+            waiter = heapq.heappop(self._queue)
+            self.in_flight += 1
+            waiter.future.set_result(True)
+
+    def _adapt(self, latency: float) -> None:
+        if latency <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return
+
+        now = monotonic()
+        if now - self._last_backoff < self.latency_target:
+            return
+        self._last_backoff = now
+        limit = max(self.min_limit, self.limit * self.backoff)
+        if int(limit) != int(self.limit):
+            logger.info("Admission limit lowered to {} after a {:.0f}ms request", int(limit), latency * 1000)
+        self.limit = limit
+
+    def stats(self) -> dict:
+        """`rejected` counts requests turned away or displaced from the queue, `timed_out` the ones which waited."""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+# Sized so every admitted request can hold a pooled connection on each shard it touches
+admission = AdmissionController(
+    limit=DB_SHARD_CONNECTIONS,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    adaptive=ADMISSION_ADAPTIVE,
+    min_limit=ADMISSION_MIN_LIMIT,
+    latency_target=ADMISSION_LATENCY_TARGET,
+)
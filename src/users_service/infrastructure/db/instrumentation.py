@@ -0,0 +1,243 @@
+"""
+SQL instrumentation hooked into the engine cursor events.
+
+- Every statement is timed and folded into per-fingerprint aggregates, a
+  fingerprint being the statement text with literals and parameters removed.
+- Statements slower than the threshold are logged with their fingerprint and
+  timing. A sample of slow SELECTs gets an `EXPLAIN (ANALYZE, BUFFERS)` plan
+  logged along with them.
+- Compiled cache hits are counted per fingerprint, which tells how much of
+  the traffic skips SQL compilation.
+- Inside `track_request()` every fingerprint and relationship lazy load is
+  counted, and repeats above the N+1 threshold are reported when the request ends.
+  Statements run in chunks on purpose carry the `batched=True` execution
+  option and are left out of that count.
+
+Usage:
+    sql_instrumentation.install(engine)
+
+    with sql_instrumentation.track_request("GET /users/..."):
+        ...
+"""
+import random
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Iterator
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext, ExecutionContext
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from src.users_service.config.settings import (
+    SQL_SLOW_QUERY_THRESHOLD, SQL_EXPLAIN_SAMPLE_RATE, SQL_N_PLUS_ONE_THRESHOLD,
+    SQL_STATS_MAX_FINGERPRINTS,
+)
+from src.users_service.utils.misc import generate_string_hash
+
+
+# Casts go before parameters, asyncpg sends `$1::UUID` which would otherwise read as `?:?`
+_NORMALIZERS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                    # string literals
+    (re.compile(r"::\w+(?:\s+with(?:out)?\s+time\s+zone)?(?:\(\d+(?:,\s*\d+)?\))?(?:\[\])*",
+                re.IGNORECASE), ""),                          # casts added by the driver
+    (re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?"), "?"),         # bound parameters of any paramstyle
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                  # numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),       # IN lists of any length
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple[str, str]:
+    """Returns `(fingerprint id, normalized statement)` for a SQL string."""
+    normalized = statement
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return generate_string_hash(normalized.encode()), normalized
+
+
+@dataclass(slots=True)
+class QueryStats:
+    statement: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    slow: int = 0
+    cache_hits: int = 0
+
+    def as_dict(self, fingerprint_id: str) -> dict:
+        return {
+            "fingerprint": fingerprint_id,
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+            "cache_hit_ratio": round(self.cache_hits / self.count, 4) if self.count else 0.0,
+        }
+
+
+@dataclass(slots=True)
+class RequestQueries:
+    name: str
+    fingerprints: Counter = field(default_factory=Counter)
+    lazy_loads: Counter = field(default_factory=Counter)
+
+
+class SQLInstrumentation:
+    """
+    Collects timings and per-request counters from engine events.
+
+    Attributes:
+        slow_threshold (timedelta): Statements taking longer are logged.
+        explain_sample_rate (float): Share of slow SELECTs to EXPLAIN ANALYZE, 0 disables it.
+        n_plus_one_threshold (int): Repeats of a fingerprint or a lazy load within
+            one request which are reported as an N+1 pattern.
+        max_fingerprints (int): Aggregates kept, new fingerprints past the limit are not tracked.
+    """
+
+    def __init__(self,
+                 slow_threshold: timedelta = SQL_SLOW_QUERY_THRESHOLD,
+                 explain_sample_rate: float = SQL_EXPLAIN_SAMPLE_RATE,
+                 n_plus_one_threshold: int = SQL_N_PLUS_ONE_THRESHOLD,
+                 max_fingerprints: int = SQL_STATS_MAX_FINGERPRINTS):
+        self.slow_threshold: float = slow_threshold.total_seconds()
+        self.explain_sample_rate: float = explain_sample_rate
+        self.n_plus_one_threshold: int = n_plus_one_threshold
+        self.max_fingerprints: int = max_fingerprints
+        self._stats: dict[str, QueryStats] = {}
+        self._request: ContextVar[RequestQueries | None] = ContextVar("sql_request", default=None)
+
+    def install(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+        if not event.contains(Session, "do_orm_execute", self._do_orm_execute):
+            event.listen(Session, "do_orm_execute", self._do_orm_execute)
+
+    def _before_cursor_execute(self, conn: Connection, cursor: Any, statement: str, parameters: Any,
+                               context: ExecutionContext, executemany: bool) -> None:
+        conn.info.setdefault("query_start", []).append((context, perf_counter()))
+
+    def _after_cursor_execute(self, conn: Connection, cursor: Any, statement: str, parameters: Any,
+                              context: ExecutionContext, executemany: bool) -> None:
+        elapsed = perf_counter() - conn.info["query_start"].pop()[1]
+        fingerprint_id, normalized = fingerprint(statement)
+
+        stats = self._stats.get(fingerprint_id)
+        if stats is None and len(self._stats) < self.max_fingerprints:
+            stats = self._stats[fingerprint_id] = QueryStats(normalized)
+        if stats is not None:
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if getattr(context, "cache_hit", None) is CacheStats.CACHE_HIT:
+                stats.cache_hits += 1
+
+        request = self._request.get()
+        batched = context is not None and context.execution_options.get("batched", False)
+        if request is not None and not batched:
+            request.fingerprints[fingerprint_id] += 1
+
+        if elapsed < self.slow_threshold:
+            return
+
+        if stats is not None:
+            stats.slow += 1
+        logger.warning("Slow query {} took {:.1f}ms: {}", fingerprint_id, elapsed * 1000, normalized)
+
+        if not executemany and self.explain_sample_rate and random.random() < self.explain_sample_rate \
+                and statement.lstrip()[:6].upper() == "SELECT":
+            self._explain(conn, statement, parameters, fingerprint_id)
+
+    def _handle_error(self, exception_context: ExceptionContext) -> None:
+        # A failed statement never reaches after_cursor_execute, its start would stay
+        # on the pooled connection's stack for good
+        connection = exception_context.connection
+        starts = connection.info.get("query_start") if connection is not None else None
+        if starts and starts[-1][0] is exception_context.execution_context:
+            starts.pop()
+
+    def _explain(self, conn: Connection, statement: str, parameters: Any, fingerprint_id: str) -> None:
+        """
+        Runs `EXPLAIN (ANALYZE, BUFFERS)` on a separate DBAPI cursor so the
+        result of the original statement is left untouched. The statement is
+        executed a second time, which is why only SELECTs are sampled.
+        A savepoint keeps a failing EXPLAIN from aborting the caller's transaction.
+        """
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT sql_instrumentation_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                cursor.execute("RELEASE SAVEPOINT sql_instrumentation_explain")
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT sql_instrumentation_explain")
+                raise
+            logger.warning("Plan of slow query {}:\n{}", fingerprint_id, plan)
+        except Exception:
+            logger.exception("Could not explain slow query {}", fingerprint_id)
+        finally:
+            cursor.close()
+
+    def _do_orm_execute(self, orm_execute_state: ORMExecuteState) -> None:
+        if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+            return
+        request = self._request.get()
+        if request is not None:
+            request.lazy_loads[str(orm_execute_state.loader_strategy_path[-1])] += 1
+
+    @contextmanager
+    def track_request(self, name: str) -> Iterator[RequestQueries]:
+        """Counts statements issued within the block and reports N+1 patterns on exit."""
+        request = RequestQueries(name)
+        token = self._request.set(request)
+        try:
+            yield request
+        finally:
+            self._request.reset(token)
+            self._report(request)
+
+    def _report(self, request: RequestQueries) -> None:
+        for relationship, count in request.lazy_loads.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning("N+1 in {}: {} lazy loaded {} times", request.name, relationship, count)
+
+        for fingerprint_id, count in request.fingerprints.items():
+            if count >= self.n_plus_one_threshold:
+                statement = self._stats[fingerprint_id].statement if fingerprint_id in self._stats else fingerprint_id
+                logger.warning("N+1 in {}: {} executed {} times: {}", request.name, fingerprint_id, count, statement)
+
+    def stats(self) -> list[dict]:
+        """Per-fingerprint aggregates, the most expensive in total first."""
+        ordered = sorted(self._stats.items(), key=lambda item: item[1].total, reverse=True)
+        return [stats.as_dict(fingerprint_id) for fingerprint_id, stats in ordered]
+
+    def cache_report(self) -> dict:
+        """Share of executions served from the compiled statement cache."""
+        executions = sum(stats.count for stats in self._stats.values())
+        hits = sum(stats.cache_hits for stats in self._stats.values())
+        return {
+            "executions": executions,
+            "cache_hits": hits,
+            "cache_misses": executions - hits,
+            "cache_hit_ratio": round(hits / executions, 4) if executions else 0.0,
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+sql_instrumentation = SQLInstrumentation()
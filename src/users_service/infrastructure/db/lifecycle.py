@@ -0,0 +1,96 @@
+"""
+Startup and shutdown of the database layer.
+
+- `warm_up()` opens pool connections in parallel before traffic arrives, so
+  the first requests after a deploy don't pay for TCP, TLS and auth setup.
+- `track()` wraps every request session, which lets `drain()` wait for the
+  in-flight ones before the engines are disposed.
+- `ready` / `draining` back the readiness endpoint.
+
+On a stop signal the server closes its listeners and lets in-flight
+requests finish, for up to its graceful shutdown timeout, and only then
+runs the lifespan shutdown. New connections are refused from the signal
+on, so a load balancer moves on to other workers, and nothing accepted is
+turned away. `drain()` is left with background sessions and the engines.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from time import perf_counter
+from typing import AsyncIterator, Iterable
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+class DatabaseLifecycle:
+
+    def __init__(self):
+        self.ready: bool = False
+        self.draining: bool = False
+        self.in_flight: int = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def warm_up(self, engine: AsyncEngine, connections: int) -> int:
+        """
+        Opens `connections` connections at once and returns them to the pool.
+        Returns how many were opened, failures are logged and skipped.
+        """
+        started = perf_counter()
+
+        async def open_connection() -> AsyncConnection:
+            connection = await engine.connect()
+            await connection.exec_driver_sql("SELECT 1")
+            return connection
+
+        # All connections are held until every one is open, otherwise the pool would hand out the same one
+        opened = await asyncio.gather(*(open_connection() for _ in range(connections)), return_exceptions=True)
+
+        warm = 0
+        for connection in opened:
+            if isinstance(connection, BaseException):
+                logger.warning("Could not open a connection during warm up: {!r}", connection)
+                continue
+            await connection.close()
+            warm += 1
+
+        logger.info("Warmed up {}/{} connections in {:.2f}s", warm, connections, perf_counter() - started)
+        return warm
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    def start_draining(self) -> None:
+        """Stops reporting ready, for good."""
+        self.ready = False
+        self.draining = True
+
+    async def wait_idle(self, timeout: timedelta) -> None:
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout.total_seconds())
+        except asyncio.TimeoutError:
+            logger.warning("{} sessions still in flight after {}, going on anyway", self.in_flight, timeout)
+
+    async def drain(self, engines: Iterable[AsyncEngine], timeout: timedelta) -> None:
+        """
+        Stops reporting ready, waits up to `timeout` for in-flight sessions
+        to finish and disposes the engines, closing every pooled connection.
+        """
+        self.start_draining()
+        await self.wait_idle(timeout)
+
+        engines = list(engines)
+        await asyncio.gather(*(engine.dispose() for engine in engines))
+        logger.info("Disposed {} database engines", len(engines))
+
+
+db_lifecycle = DatabaseLifecycle()
@@ -0,0 +1,179 @@
+"""
+Helpers for writing migrations which stay safe on large, busy tables.
+
+Alembic runs each migration in its own transaction (see `alembic/env.py`)
+with a short `lock_timeout`, so a migration waiting on a lock fails fast and
+is retried instead of queueing every other query behind it. The helpers here
+cover the operations which must not run that way:
+
+- `create_index_concurrently()` / `drop_index_concurrently()` build indexes
+  outside of the migration transaction without blocking writes.
+- `create_foreign_key_not_valid()` / `create_check_not_valid()` add
+  constraints without scanning the table under an exclusive lock, and
+  `validate_constraint()` checks existing rows afterwards under a lock
+  which does not block reads or writes.
+- `backfill_in_batches()` updates rows in keyset-ordered chunks, committing
+  each chunk, pausing between them and logging the progress.
+
+An autocommit step commits everything the migration did before it, so a
+migration retried after a lock timeout may find its earlier steps applied.
+Migrations using these helpers must be safe to rerun from the start: add
+columns with `add_column()`, the helpers themselves are rerunnable.
+
+Usage:
+    from src.users_service.infrastructure.db import migrations as m
+
+    def upgrade() -> None:
+        m.create_index_concurrently('ix_users_created_at', 'users', ['created_at'])
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.schema import CreateColumn
+
+
+# Alembic configures the stdlib logging of `alembic.*` from its ini file, loguru is never set up there
+logger = logging.getLogger("alembic.env.migrations")
+
+
+def add_column(table_name: str, column: sa.Column) -> None:
+    """`ADD COLUMN IF NOT EXISTS`, for migrations which also have autocommit steps."""
+    ddl = CreateColumn(column).compile(dialect=op.get_context().dialect)
+    op.execute(f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS {ddl}')
+
+
+def _is_invalid_index(index_name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return bool(op.get_bind().execute(
+        sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index_name)"),
+        {"index_name": index_name},
+    ).scalar())
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[str | sa.TextClause],
+                              **kw: Any) -> None:
+    """
+    `CREATE INDEX CONCURRENTLY IF NOT EXISTS`, committed on its own.
+
+    A failed concurrent build, e.g. cancelled by `lock_timeout`, leaves an
+    INVALID index behind which IF NOT EXISTS would keep. It is dropped and
+    built again.
+    """
+    with op.get_context().autocommit_block():
+        if _is_invalid_index(index_name):
+            logger.warning("Index %s is invalid after a failed build, rebuilding it", index_name)
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+        op.create_index(index_name, table_name, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table_name: str, **kw: Any) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True, **kw)
+
+
+def _drop_constraint_if_exists(constraint_name: str, table_name: str) -> None:
+    op.execute(f'ALTER TABLE "{table_name}" DROP CONSTRAINT IF EXISTS "{constraint_name}"')
+
+
+def create_foreign_key_not_valid(constraint_name: str, source_table: str, referent_table: str,
+                                 local_cols: list[str], remote_cols: list[str], **kw: Any) -> None:
+    """
+    Adds a foreign key which is enforced for new rows only. Existing rows are
+    not scanned, so the lock is held for a catalog update only.
+    Follow up with `validate_constraint()`.
+
+    A constraint of the same name, left by an interrupted earlier attempt,
+    is replaced.
+    """
+    _drop_constraint_if_exists(constraint_name, source_table)
+    op.create_foreign_key(constraint_name, source_table, referent_table, local_cols, remote_cols,
+                          postgresql_not_valid=True, **kw)
+
+
+def create_check_not_valid(constraint_name: str, table_name: str, condition: str | sa.ColumnElement,
+                           **kw: Any) -> None:
+    """
+    Adds a check constraint for new rows only, follow up with `validate_constraint()`.
+    A constraint of the same name is replaced, as in `create_foreign_key_not_valid()`.
+    """
+    _drop_constraint_if_exists(constraint_name, table_name)
+    op.create_check_constraint(constraint_name, table_name, condition, postgresql_not_valid=True, **kw)
+
+
+def validate_constraint(table_name: str, constraint_name: str) -> None:
+    """
+    Validates a `NOT VALID` constraint in its own transaction. This takes a
+    SHARE UPDATE EXCLUSIVE lock, reads and writes continue during the scan.
+    """
+    with op.get_context().autocommit_block():
+        op.execute(f'ALTER TABLE "{table_name}" VALIDATE CONSTRAINT "{constraint_name}"')
+
+
+def backfill_in_batches(table_name: str,
+                        key: str,
+                        assignments: str,
+                        where: str | None = None,
+                        batch_size: int = 1_000,
+                        pause: timedelta = timedelta(milliseconds=100),
+                        log_every: int = 10) -> int:
+    """
+    Runs `UPDATE table SET assignments [WHERE where]` in chunks of `batch_size`
+    rows ordered by `key`, one committed transaction per chunk.
+
+    Each chunk resumes after the last key of the previous one, so no chunk
+    rescans rows already handled and locks are held only for a single chunk.
+    `where` should exclude rows which are already backfilled, that keeps the
+    backfill restartable. Returns the number of updated rows.
+
+    Example:
+        backfill_in_batches('user_profiles', 'user_id', 'version = 1', where='version IS NULL')
+    """
+    def chunk_stmt(after_last_key: bool) -> sa.TextClause:
+        conditions = [f'"{key}" > :last_key'] if after_last_key else []
+        if where:
+            conditions.append(f"({where})")
+        return sa.text(f"""
+            WITH chunk AS (
+                SELECT "{key}" FROM "{table_name}"
+                {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY "{key}"
+                LIMIT :batch_size
+            )
+            UPDATE "{table_name}" SET {assignments}
+            FROM chunk WHERE "{table_name}"."{key}" = chunk."{key}"
+            RETURNING "{table_name}"."{key}"
+        """)
+
+    first_chunk, next_chunk = chunk_stmt(after_last_key=False), chunk_stmt(after_last_key=True)
+
+    updated, batches, last_key = 0, 0, None
+    started = time.monotonic()
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            if last_key is None:
+                keys = bind.execute(first_chunk, {"batch_size": batch_size}).scalars().all()
+            else:
+                keys = bind.execute(next_chunk, {"last_key": last_key, "batch_size": batch_size}).scalars().all()
+            if not keys:
+                break
+
+            updated += len(keys)
+            batches += 1
+            last_key = max(keys)
+
+            if batches % log_every == 0:
+                elapsed = time.monotonic() - started
+                logger.info("Backfill %s: %d rows in %.1fs (%.0f rows/s), last %s = %s",
+                            table_name, updated, elapsed, updated / elapsed, key, last_key)
+
+            time.sleep(pause.total_seconds())
+
+    logger.info("Backfill %s finished: %d rows in %.1fs", table_name, updated, time.monotonic() - started)
+    return updated
@@ -4,7 +4,7 @@ from datetime import datetime
 from uuid import uuid4, UUID
 
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from sqlalchemy import ForeignKey, DateTime, text, UUID as SQLUUID
+from sqlalchemy import ForeignKey, DateTime, String, Index, func, text, UUID as SQLUUID
 
 from src.users_service.config.settings import TIMEZONE
 from src.users_service.infrastructure.db.setup import Base
@@ -32,5 +32,34 @@ class UserProfile(Base):
 
     user_id: Mapped[id_] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     language: Mapped[enums.UserLanguages] = mapped_column(server_default=enums.UserLanguages.EN)
+    is_active: Mapped[bool] = mapped_column(server_default=text("true"))
+    is_deleted: Mapped[bool] = mapped_column(server_default=text("false"))
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Bumped by every profile update, exposed as the ETag for optimistic concurrency
+    version: Mapped[int] = mapped_column(server_default=text("1"))
 
     user: Mapped["User"] = relationship("User", back_populates="profile")
+
+    __table_args__ = (
+        # Live profile reads are served from this index and never visit soft-deleted rows
+        Index("ix_user_profiles_alive", "user_id", postgresql_include=["language", "is_active"],
+              postgresql_where=text("NOT is_deleted")),
+        # Lets the purge job find expired soft-deleted rows without scanning live ones
+        Index("ix_user_profiles_deleted_at", "deleted_at", postgresql_where=text("is_deleted")),
+    )
+
+
+class UserAuth(Base):
+    __tablename__ = "user_auth"
+
+    # No foreign key, the row lives on the shard of its username which may not hold the user
+    user_id: Mapped[id_] = mapped_column(primary_key=True)
+    username: Mapped[str] = mapped_column(String)
+    # Claims older than ORPHANED_CLAIM_AGE without a user are released, see flows.release_orphaned_usernames
+    created_at: Mapped[created_at]
+
+
+# Usernames are unique regardless of case, lookups go through `lower(username)`
+Index("ix_user_auth_username_lower", func.lower(UserAuth.username), unique=True)
+# Username filters pick up recent claims by `created_at`, see services/usernames.py
+Index("ix_user_auth_created_at", UserAuth.created_at)
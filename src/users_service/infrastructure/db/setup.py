@@ -1,19 +1,62 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import os
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import MetaData
 
-from src.users_service.config.settings import ASYNC_DATABASE_URL
+from src.users_service.config.settings import (
+    ASYNC_SHARD_URLS, SHARD_VIRTUAL_NODES, SQL_INSTRUMENTATION,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+)
+from src.users_service.infrastructure.db.instrumentation import sql_instrumentation
+from src.users_service.infrastructure.db.sharding import HashRing, ShardSessions
+
 
+# One engine, and so one pool, per shard
+engines: dict[str, AsyncEngine] = {
+    shard: create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    for shard, url in ASYNC_SHARD_URLS.items()
+}
 
-engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    pool_size=20,
-    max_overflow=10, 
-    pool_timeout=30,  
-    pool_recycle=1800,
-)
+
+def _dispose_inherited_pools() -> None:
+    """
+    A forked child must never reuse the parent's pooled sockets. The pools are
+    replaced without closing them, so the parent's connections stay intact
+    and the child opens its own on first use.
+    """
+    for engine in engines.values():
+        engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_pools)
+
+if SQL_INSTRUMENTATION:
+    for engine in engines.values():
+        sql_instrumentation.install(engine)
 
 metadata = MetaData()
-session_factory: sessionmaker[AsyncSession] = sessionmaker(bind=engine, class_=AsyncSession)
+session_factories: dict[str, sessionmaker[AsyncSession]] = {
+    shard: sessionmaker(bind=engine, class_=AsyncSession) for shard, engine in engines.items()
+}
+ring = HashRing(engines, SHARD_VIRTUAL_NODES)
+
+
+def session_factory_for(key: UUID | str) -> sessionmaker[AsyncSession]:
+    """Session factory of the shard owning `key`, a user id or a lower-cased username."""
+    return session_factories[ring.shard_for(key)]
+
+
+def shard_sessions() -> ShardSessions:
+    return ShardSessions(session_factories, ring)
+
 
 Base = declarative_base(metadata=metadata)
@@ -0,0 +1,106 @@
+"""
+Routing of rows to shards.
+
+- `HashRing` places every shard on a ring at `virtual_nodes` points and
+  maps a key to the first shard point at or after the key's hash. Adding a
+  shard only moves the keys falling between its points and their
+  predecessors, about 1/N of them, see `scripts/rebalance.py`.
+- `ShardSessions` opens at most one session per shard on demand, which lets
+  one request touch several shards and close them all together.
+
+Users, their profiles and every other row keyed by the user id live on
+`shard_for(user_id)`. Usernames live on `shard_for(username.lower())`, so
+the unique index on `lower(username)` keeps them unique across all shards.
+"""
+import bisect
+from typing import Hashable, Iterable, TypeVar
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from xxhash import xxh3_64_intdigest
+
+
+K = TypeVar("K", bound=Hashable)
+
+
+def _hash(key: UUID | str | bytes) -> int:
+    if isinstance(key, UUID):
+        key = key.bytes
+    elif isinstance(key, str):
+        key = key.encode()
+    return xxh3_64_intdigest(key)
+
+
+class HashRing:
+    """
+    Attributes:
+        shards (tuple[str, ...]): Shard names, their order doesn't matter.
+        virtual_nodes (int): Points per shard on the ring.
+    """
+
+    def __init__(self, shards: Iterable[str], virtual_nodes: int):
+        self.shards: tuple[str, ...] = tuple(sorted(shards))
+        self.virtual_nodes: int = virtual_nodes
+        if not self.shards:
+            raise ValueError("A hash ring needs at least one shard")
+
+        points = sorted((_hash(f"{shard}#{node}"), shard)
+                        for shard in self.shards for node in range(virtual_nodes))
+        self._points: list[int] = [point for point, _ in points]
+        self._owners: list[str] = [shard for _, shard in points]
+
+    def shard_for(self, key: UUID | str | bytes) -> str:
+        if len(self.shards) == 1:
+            return self.shards[0]
+        index = bisect.bisect_left(self._points, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def group(self, keys: Iterable[K]) -> dict[str, list[K]]:
+        """Keys grouped by their shard, in their original order within each group."""
+        groups: dict[str, list[K]] = {}
+        for key in keys:
+            groups.setdefault(self.shard_for(key), []).append(key)
+        return groups
+
+
+class ShardSessions:
+    """
+    Sessions of one unit of work, one per shard, opened on first use.
+
+    Sessions of different shards may be used concurrently, a single
+    session must still be used by one task at a time.
+
+    Usage:
+        async with ShardSessions(session_factories, ring) as shards:
+            session = shards.for_key(user_id)
+    """
+
+    def __init__(self, factories: dict[str, sessionmaker[AsyncSession]], ring: HashRing):
+        self.factories = factories
+        self.ring = ring
+        self._sessions: dict[str, AsyncSession] = {}
+
+    def for_shard(self, shard: str) -> AsyncSession:
+        session = self._sessions.get(shard)
+        if session is None:
+            session = self._sessions[shard] = self.factories[shard]()
+        return session
+
+    def for_key(self, key: UUID | str | bytes) -> AsyncSession:
+        return self.for_shard(self.ring.shard_for(key))
+
+    def all(self) -> dict[str, AsyncSession]:
+        """A session on every shard, for work which has to visit all of them."""
+        return {shard: self.for_shard(shard) for shard in self.ring.shards}
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+    async def __aenter__(self) -> "ShardSessions":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
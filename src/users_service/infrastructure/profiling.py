@@ -0,0 +1,133 @@
+"""
+On-demand profiling of single requests with cProfile.
+
+- `start()` hands out the profiler when nothing else is being profiled,
+  one request at a time per worker, others run unprofiled.
+- `save()` writes the profile as a `.pstats` file and keeps only the
+  newest `max_files` of them in `directory`, shared by every worker.
+
+cProfile follows the thread, not the task: while the profiled request waits,
+the work of concurrent requests is recorded as well. Profile slow requests
+under little concurrency, or read the profile from the handler's frame down.
+
+Profiles open with the standard tools:
+    python -m pstats 20260101T120000-1234-1-POST-users-lookup.pstats
+    snakeviz 20260101T120000-1234-1-POST-users-lookup.pstats
+
+Usage:
+    profile = request_profiler.start()
+    if profile is not None:
+        try:
+            ...
+        finally:
+            await request_profiler.save(profile, name)
+"""
+import asyncio
+import cProfile
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+
+from loguru import logger
+
+from src.users_service.config.settings import (
+    TIMEZONE, PROFILING_DIR, PROFILING_MAX_FILES, PROFILING_SAMPLE_RATE,
+)
+
+
+SUFFIX = ".pstats"
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class RequestProfiler:
+    """
+    Attributes:
+        directory (Path): Where profiles are written.
+        max_files (int): Profiles kept, the oldest ones are removed first.
+        sample_rate (float): Share of requests profiled without being asked to.
+    """
+
+    def __init__(self, directory: Path, max_files: int, sample_rate: float = 0.0):
+        self.directory: Path = directory
+        self.max_files: int = max_files
+        self.sample_rate: float = sample_rate
+        self._lock = threading.Lock()
+        self._seq = count(1)
+
+    def sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def name(self, method: str, path: str) -> str:
+        """A file name unique across workers, sorting by creation time."""
+        started = datetime.now(TIMEZONE).strftime("%Y%m%dT%H%M%S")
+        route = _UNSAFE.sub("-", path).strip("-") or "root"
+        return f"{started}-{os.getpid()}-{next(self._seq)}-{method}-{route}"[:200] + SUFFIX
+
+    def start(self) -> cProfile.Profile | None:
+        """An enabled profiler, or None when another request is being profiled."""
+        if not self._lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            self._lock.release()
+            return None
+        return profile
+
+    async def save(self, profile: cProfile.Profile, name: str) -> None:
+        profile.disable()
+        try:
+            # Marshalling the stats and pruning touch the disk, keep it off the loop
+            await asyncio.to_thread(self._write, profile, name)
+        except OSError:
+            logger.exception("Profile {} could not be saved", name)
+        finally:
+            self._lock.release()
+
+    def _write(self, profile: cProfile.Profile, name: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(self.directory / name)
+        for path in self.profiles()[self.max_files:]:
+            path.unlink(missing_ok=True)
+
+    def profiles(self) -> list[Path]:
+        """Saved profiles, newest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{SUFFIX}"), key=lambda path: path.name, reverse=True)
+
+    def saved(self) -> list[dict]:
+        saved = []
+        for path in self.profiles():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Pruned by another worker in the meantime
+                continue
+            saved.append({
+                "name": path.name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, TIMEZONE),
+            })
+        return saved
+
+    def path(self, name: str) -> Path | None:
+        """The saved profile called `name`, None for anything else."""
+        if _UNSAFE.search(name) or not name.endswith(SUFFIX):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+request_profiler = RequestProfiler(
+    directory=PROFILING_DIR,
+    max_files=PROFILING_MAX_FILES,
+    sample_rate=PROFILING_SAMPLE_RATE,
+)
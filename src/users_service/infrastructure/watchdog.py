@@ -0,0 +1,146 @@
+"""
+Event loop lag measurement and stall reports.
+
+- A task sleeps `interval` in a loop, every wake up later than planned is
+  the time the loop was busy with something else. Lags go into a
+  histogram, see `stats()`.
+- A helper thread checks the task's heartbeat. Once it is older than
+  `threshold` the loop is stuck in synchronous code, and the thread logs
+  the loop thread's current stack and task, at most once per stall and
+  once every `log_interval`.
+
+The stack points at the blocking call itself: a synchronous log sink, a
+large validation, CPU bound work which belongs in a thread or a process.
+
+Usage:
+    loop_watchdog.start()
+    ...
+    await loop_watchdog.stop()
+"""
+import asyncio
+import sys
+import threading
+import traceback
+from bisect import bisect_left
+from datetime import timedelta
+from time import monotonic
+
+from loguru import logger
+
+from src.users_service.config.settings import (
+    LOOP_WATCHDOG_INTERVAL, LOOP_STALL_THRESHOLD, LOOP_STALL_LOG_INTERVAL, LOOP_LAG_BUCKETS_MS,
+)
+
+
+class LoopWatchdog:
+    """
+    Attributes:
+        interval (float): Seconds between heartbeats, also the thread's check period.
+        threshold (float): Seconds without a heartbeat counted as a stall.
+        log_interval (float): Seconds between two stall reports.
+        buckets (tuple[float, ...]): Upper bounds of the lag histogram, in milliseconds.
+    """
+
+    def __init__(self,
+                 interval: timedelta,
+                 threshold: timedelta,
+                 log_interval: timedelta,
+                 buckets: tuple[float, ...]):
+        self.interval: float = interval.total_seconds()
+        self.threshold: float = threshold.total_seconds()
+        self.log_interval: float = log_interval.total_seconds()
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+
+        self.counts: list[int] = [0] * (len(self.buckets) + 1)
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.stalls: int = 0
+        self.reported: int = 0
+
+        self._heartbeat: float = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def observe(self, lag: float) -> None:
+        lag_ms = lag * 1000
+        self.counts[bisect_left(self.buckets, lag_ms)] += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+
+    async def _beat(self) -> None:
+        while True:
+            self._heartbeat = planned = monotonic()
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, monotonic() - planned - self.interval))
+
+    def _watch(self) -> None:
+        stalled_since = None
+        last_report = float("-inf")
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or heartbeat == stalled_since:
+                continue
+
+            # A new stall, the heartbeat hasn't moved for longer than the threshold
+            stalled_since = heartbeat
+            self.stalls += 1
+            if monotonic() - last_report < self.log_interval:
+                continue
+            last_report = monotonic()
+            self.reported += 1
+            self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        task = asyncio.current_task(self._loop)
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning("Event loop blocked for {:.0f}ms in task {}:\n{}",
+                       blocked * 1000, task.get_name() if task else None, stack)
+
+    def start(self) -> None:
+        """Starts watching the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+        self._task = self._thread = None
+
+    def stats(self) -> dict:
+        count = sum(self.counts)
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {
+            "count": count,
+            "mean_ms": round(self.total / count * 1000, 3) if count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "stalls": self.stalls,
+            "reported": self.reported,
+            "buckets": buckets,
+        }
+
+
+loop_watchdog = LoopWatchdog(
+    interval=LOOP_WATCHDOG_INTERVAL,
+    threshold=LOOP_STALL_THRESHOLD,
+    log_interval=LOOP_STALL_LOG_INTERVAL,
+    buckets=LOOP_LAG_BUCKETS_MS,
+)
@@ -1,8 +1,21 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from loguru import logger
 
+from .config.settings import (
+    USERNAME_FILTER_REBUILD_INTERVAL, USERNAME_FILTER_REFRESH_INTERVAL, PURGE_INTERVAL,
+    DB_WARM_UP_CONNECTIONS, DB_DRAIN_TIMEOUT, LOOP_WATCHDOG, DB_WARM_UP_RETRY_INTERVAL,
+)
 from .infrastructure.logging import set_log
 from .api.router import router
+from .api.debug import router as debug_router
+from .api.health import router as health_router
+from .infrastructure.db.lifecycle import db_lifecycle
+from .infrastructure.db.setup import engines
+from .infrastructure.watchdog import loop_watchdog
+from .services import jobs
+from .services.queries import statements
 
 
 set_log()
@@ -12,6 +25,52 @@ set_log()
 async def lifespan(app: FastAPI):
     
     app.include_router(router)
+    app.include_router(debug_router)
+    app.include_router(health_router)
+
+    # Started first, so stalls during warm up are reported as well
+    if LOOP_WATCHDOG:
+        loop_watchdog.start()
+
+    async def warm_up(shard, engine) -> bool:
+        try:
+            if not await db_lifecycle.warm_up(engine, DB_WARM_UP_CONNECTIONS):
+                raise ConnectionError("no connection could be opened")
+            await statements.warm_up(engine)
+        except Exception:
+            logger.exception("Warm up of shard {} failed, retrying in {}", shard, DB_WARM_UP_RETRY_INTERVAL)
+            return False
+        return True
+
+    async def warm_up_all(pending: dict) -> None:
+        """Retries the shards which failed until all of them are warm, only then the worker reports ready."""
+        while pending:
+            results = await asyncio.gather(*(warm_up(shard, engine) for shard, engine in pending.items()))
+            pending = {shard: engine for (shard, engine), warm in zip(pending.items(), results) if not warm}
+            if pending:
+                await asyncio.sleep(DB_WARM_UP_RETRY_INTERVAL.total_seconds())
+        if not db_lifecycle.draining:
+            db_lifecycle.ready = True
+
+    # A first attempt holds the startup back, further ones run in the background
+    results = await asyncio.gather(*(warm_up(shard, engine) for shard, engine in engines.items()))
+    failed = {shard: engine for (shard, engine), warm in zip(engines.items(), results) if not warm}
+
+    background = [
+        asyncio.create_task(warm_up_all(failed)),
+        asyncio.create_task(jobs.run_periodically(jobs.load_username_filter, USERNAME_FILTER_REBUILD_INTERVAL)),
+        asyncio.create_task(jobs.run_periodically(jobs.refresh_username_filter, USERNAME_FILTER_REFRESH_INTERVAL)),
+        asyncio.create_task(jobs.run_periodically(jobs.purge_deleted_users, PURGE_INTERVAL)),
+    ]
 
     yield
 
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+
+    await db_lifecycle.drain(engines.values(), DB_DRAIN_TIMEOUT)
+
+    if LOOP_WATCHDOG:
+        await loop_watchdog.stop()
+
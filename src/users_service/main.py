@@ -1,6 +1,28 @@
 from fastapi import FastAPI
 
+from .config.settings import (
+    SQL_INSTRUMENTATION,
+    ADMISSION_CONTROL, ADMISSION_ROUTE_PRIORITIES, ADMISSION_DEFAULT_PRIORITY, ADMISSION_EXEMPT_PATHS,
+    ADMISSION_RETRY_AFTER, PROFILING,
+)
 from .loader import lifespan
+from .api.middlewares import (
+    AdmissionMiddleware, ProfilingMiddleware, SQLTrackingMiddleware,
+)
+from .infrastructure.admission import admission
+from .infrastructure.profiling import request_profiler
 
 
 app = FastAPI(lifespan=lifespan)
+
+# Innermost, so queueing for admission doesn't show up in profiles
+if PROFILING:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware, controller=admission, priorities=ADMISSION_ROUTE_PRIORITIES,
+                       default_priority=ADMISSION_DEFAULT_PRIORITY, exempt=ADMISSION_EXEMPT_PATHS,
+                       retry_after=ADMISSION_RETRY_AFTER)
+
+if SQL_INSTRUMENTATION:
+    app.add_middleware(SQLTrackingMiddleware)
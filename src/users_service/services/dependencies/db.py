@@ -1,14 +1,26 @@
 from typing import AsyncGenerator
+from uuid import UUID
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.users_service.infrastructure.db.setup import session_factory
+from src.users_service.infrastructure.db.lifecycle import db_lifecycle
+from src.users_service.infrastructure.db.setup import session_factory_for, shard_sessions
+from src.users_service.infrastructure.db.sharding import ShardSessions
+
+
+async def user_session(user_id: UUID) -> AsyncGenerator[AsyncSession, None]:
+    """Session on the shard owning the `user_id` path parameter."""
+    async with db_lifecycle.track(), session_factory_for(user_id)() as session:
+        yield session
 
 
-async def session() -> AsyncGenerator[AsyncSession, None]:
-    async with session_factory() as session:
+async def username_session(username: str) -> AsyncGenerator[AsyncSession, None]:
+    """Session on the shard owning the `username` path parameter."""
+    async with db_lifecycle.track(), session_factory_for(username.lower())() as session:
         yield session
 
 
-async def transaction() -> AsyncGenerator[AsyncSession, None]:
-    async with session_factory() as transaction:
-        yield transaction
+async def shards() -> AsyncGenerator[ShardSessions, None]:
+    """Sessions opened on demand on any shard, for requests which aren't bound to a single one."""
+    async with db_lifecycle.track(), shard_sessions() as sessions:
+        yield sessions
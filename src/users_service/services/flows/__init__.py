@@ -1,2 +1,2 @@
-from .dto import r, p
+from .dto import p
 from ._flows import *
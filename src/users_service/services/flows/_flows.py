@@ -1,16 +1,248 @@
+import asyncio
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .dto import p, r
+from .dto import p
+from src.users_service.config.settings import (
+    TIMEZONE, SOFT_DELETE_BATCH_SIZE, PURGE_RETENTION, PURGE_BATCH_SIZE, PURGE_BATCH_PAUSE, ORPHANED_CLAIM_AGE,
+)
+from src.users_service.domain import exceptions
+from src.users_service.domain.models import models
+from src.users_service.infrastructure.db.sharding import ShardSessions
 from src.users_service.services import queries
+from src.users_service.services.usernames import username_filter
+
+
+async def create_user(param: p.CreateUserDTO, shards: ShardSessions) -> models.UserSummary:
+    """
+    The id is generated first, it picks the shard the user is stored on.
+
+    The username is claimed on its own shard, where the unique index makes it
+    unique across all shards. When that is another shard the claim is
+    committed before the user is created and released again if that fails.
+    A claim left behind by a crash in between is released by
+    `release_orphaned_usernames()`.
+    """
+    user_id = uuid4()
+    session = shards.for_key(user_id)
+    claim_session = None
+
+    if param.username is not None:
+        claim_session = shards.for_key(username_filter.normalize(param.username))
+        try:
+            await queries.users_auth.create(
+                queries.p.users_auth.CreateDTO(user_id=user_id, username=param.username), claim_session)
+        except IntegrityError as exc:
+            raise exceptions.UsernameTakenError(param.username) from exc
+
+        # Registered before the commit, a rolled back insert only costs a false positive
+        username_filter.add(param.username)
+
+        if claim_session is session:
+            claim_session = None
+        else:
+            await claim_session.commit()
+
+    try:
+        user = await queries.users.create(
+            queries.p.users.CreateDTO(id=user_id), session)
+
+        profile = await queries.users_profile.create(
+            queries.p.users_profile.CreateDTO(user_id=user.id, language=param.language), session)
+
+        await session.commit()
+    except Exception:
+        if claim_session is not None:
+            await _release_usernames([user_id], [claim_session])
+        raise
+
+    return models.UserSummary(user.id, user.created_at, user.updated_at,
+                              profile.language, profile.is_active, profile.version, param.username)
+
+
+async def _release_usernames(user_ids: list[UUID], sessions: list[AsyncSession]) -> None:
+    """Deletes the usernames of `user_ids` through `sessions` and commits each of them."""
+    param = queries.p.users_auth.DeleteDTO(user_ids=user_ids)
+    await asyncio.gather(*(queries.users_auth.delete(param, session) for session in sessions))
+    await asyncio.gather(*(session.commit() for session in sessions))
+
+
+async def get_user(param: p.GetUserDTO, session: AsyncSession) -> models.UserSummary:
+    user = await queries.users.get(queries.p.users.GetDTO(user_id=param.user_id), session)
+
+    if user is None:
+        raise exceptions.UserNotFoundError(param.user_id)
+
+    return user
+
+
+async def get_users(param: p.GetUsersDTO, shards: ShardSessions) -> list[models.UserSummary]:
+    """
+    Live users among `user_ids` in the requested order, unknown and deleted ids are left out.
+    Every shard involved is queried at the same time. The ids come validated, they aren't validated again.
+    """
+    user_ids = list(dict.fromkeys(param.user_ids))
+    per_shard = await asyncio.gather(*(
+        queries.users.get_many(queries.p.users.GetManyDTO.model_construct(user_ids=shard_user_ids),
+                               shards.for_shard(shard))
+        for shard, shard_user_ids in shards.ring.group(user_ids).items()
+    ))
+    found = {user.id: user for users in per_shard for user in users}
+
+    return [found[user_id] for user_id in user_ids if user_id in found]
+
+
+async def check_username(param: p.UsernameAvailabilityDTO, session: AsyncSession) -> models.UsernameAvailability:
+    if not username_filter.might_exist(param.username):
+        return models.UsernameAvailability(param.username, available=True)
+
+    taken = await queries.users_auth.username_exists(
+        queries.p.users_auth.UsernameExistsDTO(username=param.username), session)
+
+    return models.UsernameAvailability(param.username, available=not taken)
+
+
+def get_username_filter_stats() -> dict:
+    return username_filter.stats()
+
+
+async def set_user_active(param: p.SetUserActiveDTO, session: AsyncSession) -> None:
+    updated = await queries.users_profile.set_active(
+        queries.p.users_profile.SetActiveDTO(user_id=param.user_id, is_active=param.is_active), session)
+
+    if not updated:
+        raise exceptions.UserNotFoundError(param.user_id)
+
+    await session.commit()
+
+
+async def delete_user(param: p.DeleteUserDTO, session: AsyncSession) -> None:
+    deleted = await queries.users_profile.soft_delete(
+        queries.p.users_profile.SoftDeleteDTO(user_ids=[param.user_id]), session)
+
+    if not deleted:
+        raise exceptions.UserNotFoundError(param.user_id)
+
+    await session.commit()
+
+
+async def delete_users(param: p.DeleteUsersDTO, shards: ShardSessions) -> int:
+    """
+    Soft-deletes users in batches of `SOFT_DELETE_BATCH_SIZE`, committing each
+    batch so row locks are held only for one short transaction at a time.
+    Ids are sorted to keep the lock order stable between concurrent calls.
+    Shards are worked on at the same time.
+    """
+    async def delete_on_shard(session: AsyncSession, user_ids: list[UUID]) -> int:
+        deleted = 0
+        for start in range(0, len(user_ids), SOFT_DELETE_BATCH_SIZE):
+            deleted += await queries.users_profile.soft_delete(
+                queries.p.users_profile.SoftDeleteDTO(user_ids=user_ids[start:start + SOFT_DELETE_BATCH_SIZE]),
+                session)
+            await session.commit()
+        return deleted
+
+    deleted = await asyncio.gather(*(
+        delete_on_shard(shards.for_shard(shard), user_ids)
+        for shard, user_ids in shards.ring.group(sorted(set(param.user_ids))).items()
+    ))
+    return sum(deleted)
+
+
+async def purge_deleted_users(shards: ShardSessions) -> int:
+    """
+    Hard-deletes users soft-deleted more than `PURGE_RETENTION` ago, shard by
+    shard, one chunk per transaction with a short pause in between to leave
+    room for live traffic.
+
+    A chunk's usernames may live on any shard, they are released everywhere
+    before its users are deleted. If the purge stops in between, the users
+    stay soft-deleted and the next run picks them up again.
+    """
+    sessions = shards.all()
+    purged = 0
+
+    for shard, session in sessions.items():
+        while True:
+            user_ids = await queries.users.get_expired(
+                queries.p.users.GetExpiredDTO(retention=PURGE_RETENTION, limit=PURGE_BATCH_SIZE), session)
+
+            if user_ids:
+                # This shard's usernames are deleted in the purge transaction, which still locks the users
+                other_sessions = [other for name, other in sessions.items() if name != shard]
+                await queries.users_auth.delete(queries.p.users_auth.DeleteDTO(user_ids=user_ids), session)
+                await _release_usernames(user_ids, other_sessions)
+                purged += await queries.users.purge(queries.p.users.PurgeDTO(user_ids=user_ids), session)
+
+            await session.commit()
+
+            if len(user_ids) < PURGE_BATCH_SIZE:
+                break
+
+            await asyncio.sleep(PURGE_BATCH_PAUSE.total_seconds())
+
+    return purged
+
+
+async def release_orphaned_usernames(shards: ShardSessions) -> int:
+    """
+    Releases usernames claimed more than `ORPHANED_CLAIM_AGE` ago whose user
+    doesn't exist on its shard. `create_user` commits a claim on another shard
+    before the user, a process dying in between leaves the claim behind.
+
+    Claims are read in chunks per shard, their users checked on the shards
+    owning them, and the orphaned ones deleted in one transaction per chunk.
+    """
+    sessions = shards.all()
+    claimed_before = datetime.now(TIMEZONE).replace(tzinfo=None) - ORPHANED_CLAIM_AGE
+    released = 0
+
+    for shard, session in sessions.items():
+        after = UUID(int=0)
+        while True:
+            user_ids = await queries.users_auth.get_old_claims(
+                queries.p.users_auth.GetOldClaimsDTO(claimed_before=claimed_before, after=after,
+                                                     limit=PURGE_BATCH_SIZE),
+                session)
+            if not user_ids:
+                break
+            after = user_ids[-1]
+
+            existing = await asyncio.gather(*(
+                queries.users.get_existing(queries.p.users.GetExistingDTO(user_ids=owned), shards.for_shard(owner))
+                for owner, owned in shards.ring.group(user_ids).items()
+            ))
+            orphaned = set(user_ids).difference(*existing)
+
+            if orphaned:
+                released += await queries.users_auth.delete(
+                    queries.p.users_auth.DeleteDTO(user_ids=list(orphaned)), session)
+            # Ends the read transactions on the other shards too
+            await asyncio.gather(*(other.commit() for other in sessions.values()))
+
+            if len(user_ids) < PURGE_BATCH_SIZE:
+                break
+
+            await asyncio.sleep(PURGE_BATCH_PAUSE.total_seconds())
+
+    return released
+
+
+async def update_profile(param: p.UpdateProfileDTO, session: AsyncSession) -> models.UserSummary:
+    updated = await queries.users_profile.update(
+        queries.p.users_profile.UpdateDTO(**param.model_dump(exclude_unset=True)), session)
 
+    if updated is None:
+        # The single statement matched nothing, find out whether the user is gone or the version moved on
+        current_version = await queries.users_profile.get_version(
+            queries.p.users_profile.GetVersionDTO(user_id=param.user_id), session)
+        if current_version is None:
+            raise exceptions.UserNotFoundError(param.user_id)
+        raise exceptions.VersionConflictError(current_version)
 
-async def create_user(param: p.CreateUserDTO, session: AsyncSession) -> r.CreateUserDTO:
-    user = await queries.users.create(
-        queries.p.users.CreateDTO(), session)
-    
-    profile = await queries.users_profile.create(
-        queries.p.users_profile.CreateDTO(user_id=user.id, language=param.language), session)
-    
     await session.commit()
 
-    return r.CreateUserDTO.v(user, profile)
+    return updated
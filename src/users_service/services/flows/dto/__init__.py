@@ -1,4 +1,3 @@
 from . import parameters as p
-from . import responses as r
 
-__all__ = ["p", "r"]
+__all__ = ["p"]
@@ -3,4 +3,36 @@ from src.users_service.utils.dto import BaseDTO, s
 
 class CreateUserDTO(BaseDTO):
     language: s.UserProfile.language
-    
\ No newline at end of file
+    username: s.UserAuth.username | None = None
+
+
+class UsernameAvailabilityDTO(BaseDTO):
+    username: s.UserAuth.username
+
+
+class SetUserActiveDTO(BaseDTO):
+    user_id: s.User.id
+    is_active: s.UserProfile.is_active
+
+
+class DeleteUserDTO(BaseDTO):
+    user_id: s.User.id
+
+
+class DeleteUsersDTO(BaseDTO):
+    user_ids: list[s.User.id]
+
+
+class UpdateProfileDTO(BaseDTO):
+    """Only the fields explicitly set on the instance are updated."""
+    user_id: s.User.id
+    language: s.UserProfile.language
+    expected_version: s.UserProfile.version | None = None
+
+
+class GetUserDTO(BaseDTO):
+    user_id: s.User.id
+
+
+class GetUsersDTO(BaseDTO):
+    user_ids: list[s.User.id]
@@ -0,0 +1,48 @@
+"""
+Background jobs which run inside the service process for its whole lifetime.
+They are started and cancelled by the application lifespan.
+"""
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+from src.users_service.infrastructure.db.setup import shard_sessions
+from src.users_service.services import flows
+from src.users_service.services.usernames import username_filter
+
+
+async def run_periodically(job: Callable[[], Awaitable[None]], interval: timedelta) -> None:
+    """
+    Runs `job` right away and then every `interval` until cancelled.
+    Failures are logged and the job is retried on the next tick.
+    """
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background job {} failed", job.__name__)
+        await asyncio.sleep(interval.total_seconds())
+
+
+async def load_username_filter() -> None:
+    async with shard_sessions() as shards:
+        await username_filter.load(shards)
+
+
+async def refresh_username_filter() -> None:
+    async with shard_sessions() as shards:
+        await username_filter.refresh(shards)
+
+
+async def purge_deleted_users() -> None:
+    async with shard_sessions() as shards:
+        purged = await flows.purge_deleted_users(shards)
+        released = await flows.release_orphaned_usernames(shards)
+    if purged:
+        logger.info("Purged {} soft-deleted users", purged)
+    if released:
+        logger.info("Released {} usernames claimed by users which were never created", released)
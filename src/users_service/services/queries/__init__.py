@@ -1,4 +1,5 @@
-from .dto import p, r
+from .dto import p
+from . import statements
 from .queries import users
 from .queries import users_auth
 from .queries import users_profile
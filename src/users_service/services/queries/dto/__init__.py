@@ -1,5 +1,4 @@
 from . import parameters as p
-from . import responses as r
 
 
-__all__ = ["p", "r"]
+__all__ = ["p"]
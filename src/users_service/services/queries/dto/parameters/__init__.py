@@ -1,2 +1,3 @@
 from . import users
+from . import users_auth
 from . import users_profile
\ No newline at end of file
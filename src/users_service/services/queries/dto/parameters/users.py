@@ -1,5 +1,28 @@
+from datetime import timedelta
+
 from src.users_service.utils.dto import BaseDTO, s
 
 
 class CreateDTO(BaseDTO):
-    pass
+    id: s.User.id
+
+
+class GetExpiredDTO(BaseDTO):
+    retention: timedelta
+    limit: int
+
+
+class GetExistingDTO(BaseDTO):
+    user_ids: list[s.User.id]
+
+
+class PurgeDTO(BaseDTO):
+    user_ids: list[s.User.id]
+
+
+class GetDTO(BaseDTO):
+    user_id: s.User.id
+
+
+class GetManyDTO(BaseDTO):
+    user_ids: list[s.User.id]
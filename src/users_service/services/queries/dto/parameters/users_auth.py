@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from src.users_service.utils.dto import BaseDTO, s
+
+
+class CreateDTO(BaseDTO):
+    user_id: s.UserAuth.user_id
+    username: s.UserAuth.username
+
+
+class UsernameExistsDTO(BaseDTO):
+    username: s.UserAuth.username
+
+
+class DeleteDTO(BaseDTO):
+    user_ids: list[s.UserAuth.user_id]
+
+
+class GetClaimsSinceDTO(BaseDTO):
+    claimed_since: datetime
+
+
+class GetOldClaimsDTO(BaseDTO):
+    claimed_before: datetime
+    after: s.UserAuth.user_id
+    limit: int
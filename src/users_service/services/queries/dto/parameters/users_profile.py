@@ -4,4 +4,23 @@ from src.users_service.utils.dto import BaseDTO, s
 class CreateDTO(BaseDTO):
     user_id: s.UserProfile.user_id
     language: s.UserProfile.language
-    
\ No newline at end of file
+
+
+class SetActiveDTO(BaseDTO):
+    user_id: s.UserProfile.user_id
+    is_active: s.UserProfile.is_active
+
+
+class SoftDeleteDTO(BaseDTO):
+    user_ids: list[s.UserProfile.user_id]
+
+
+class UpdateDTO(BaseDTO):
+    """Only the fields explicitly set on the instance are written."""
+    user_id: s.UserProfile.user_id
+    language: s.UserProfile.language
+    expected_version: s.UserProfile.version | None = None
+
+
+class GetVersionDTO(BaseDTO):
+    user_id: s.UserProfile.user_id
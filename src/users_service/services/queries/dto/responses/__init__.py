@@ -1,2 +0,0 @@
-from . import users
-from . import users_profile
@@ -1,7 +0,0 @@
-from src.users_service.utils.dto import BaseDTO, s
-
-
-class CreateDTO(BaseDTO):
-    id: s.User.id
-    created_at: s.User.created_at
-    updated_at: s.User.updated_at
@@ -1,16 +1,44 @@
+from uuid import UUID
+
 from sqlalchemy.ext.asyncio import AsyncSession
-import sqlalchemy as sa
-from sqlalchemy.orm import load_only
 
-from src.users_service.infrastructure.db import models
-from src.users_service.domain.models import enums
+from src.users_service.domain.models import models
+from .. import statements as st
+from ..dto import p
+
+
+async def create(param: p.users.CreateDTO, session: AsyncSession) -> models.User:
+    row = (await session.execute(st.INSERT_USER, {"id": param.id})).one()
+    return models.User(*row)
+
+
+async def get(param: p.users.GetDTO, session: AsyncSession) -> models.UserSummary | None:
+    row = (await session.execute(st.SELECT_USER_SUMMARY, {"user_id": param.user_id})).one_or_none()
+    return None if row is None else models.UserSummary(*row)
+
+
+async def get_many(param: p.users.GetManyDTO, session: AsyncSession) -> list[models.UserSummary]:
+    """Live users among `user_ids`, in no particular order, missing ids are skipped."""
+    result = await session.execute(st.SELECT_USER_SUMMARIES, {"user_ids": param.user_ids})
+    return [models.UserSummary(*row) for row in result]
+
+
+async def get_expired(param: p.users.GetExpiredDTO, session: AsyncSession) -> list[UUID]:
+    """
+    Ids of up to `limit` users soft-deleted longer than `retention` ago, locked
+    until the transaction ends. Rows locked by a concurrent purge are skipped.
+    """
+    result = await session.execute(st.SELECT_EXPIRED_USERS, {"retention": param.retention, "limit": param.limit})
+    return list(result.scalars())
 
-from ..dto import p, r
 
+async def get_existing(param: p.users.GetExistingDTO, session: AsyncSession) -> set[UUID]:
+    """Ids among `user_ids` with a user row, deleted or not."""
+    result = await session.execute(st.SELECT_EXISTING_USERS, {"user_ids": param.user_ids})
+    return set(result.scalars())
 
 
-async def create(param: p.users.CreateDTO, session: AsyncSession) -> r.users.CreateDTO:
-    user = models.User()
-    session.add(user)
-    await session.flush([user])
-    return r.users.CreateDTO.model_validate(user)
+async def purge(param: p.users.PurgeDTO, session: AsyncSession) -> int:
+    """Hard-deletes users, their profiles go with them through `ON DELETE CASCADE`."""
+    result = await session.execute(st.DELETE_USERS, {"b_user_ids": param.user_ids})
+    return result.rowcount
@@ -1,8 +1,51 @@
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import UUID
+
 from sqlalchemy.ext.asyncio import AsyncSession
-import sqlalchemy as sa
-from sqlalchemy.orm import load_only
 
-from src.users_service.infrastructure.db import models
-from src.users_service.domain.models import enums
+from src.users_service.domain.models import models
+from .. import statements as st
+from ..dto import p
+
+
+async def create(param: p.users_auth.CreateDTO, session: AsyncSession) -> models.UserAuth:
+    row = (await session.execute(st.INSERT_AUTH, param.model_dump())).one()
+    return models.UserAuth(*row)
+
+
+async def username_exists(param: p.users_auth.UsernameExistsDTO, session: AsyncSession) -> bool:
+    return await session.scalar(st.USERNAME_EXISTS, {"username": param.username.lower()})
+
+
+async def count(session: AsyncSession) -> int:
+    return await session.scalar(st.COUNT_USERNAMES)
+
+
+async def stream_usernames(session: AsyncSession, batch_size: int) -> AsyncIterator[str]:
+    """Streams every username through a server side cursor, `batch_size` rows at a time."""
+    result = await session.stream_scalars(st.SELECT_USERNAMES, execution_options={"yield_per": batch_size})
+    async for username in result:
+        yield username
+
+
+async def last_claimed_at(session: AsyncSession) -> datetime | None:
+    return await session.scalar(st.LAST_CLAIMED_AT)
+
+
+async def get_claims_since(param: p.users_auth.GetClaimsSinceDTO,
+                           session: AsyncSession) -> list[tuple[str, datetime]]:
+    """`(username, created_at)` of the usernames claimed at or after `claimed_since`."""
+    result = await session.execute(st.SELECT_CLAIMS_SINCE, param.model_dump())
+    return [(username, created_at) for username, created_at in result]
+
+
+async def get_old_claims(param: p.users_auth.GetOldClaimsDTO, session: AsyncSession) -> list[UUID]:
+    """User ids of up to `limit` usernames claimed before `claimed_before`, after `after` in id order."""
+    result = await session.execute(st.SELECT_OLD_CLAIMS, param.model_dump())
+    return list(result.scalars())
+
 
-from ..dto import p, r
+async def delete(param: p.users_auth.DeleteDTO, session: AsyncSession) -> int:
+    result = await session.execute(st.DELETE_AUTH, {"b_user_ids": param.user_ids})
+    return result.rowcount
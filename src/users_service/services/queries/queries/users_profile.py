@@ -1,15 +1,47 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-import sqlalchemy as sa
-from sqlalchemy.orm import load_only
 
-from src.users_service.infrastructure.db import models
-from src.users_service.domain.models import enums
+from src.users_service.domain.models import models
+from .. import statements as st
+from ..dto import p
 
-from ..dto import p, r
 
+async def create(param: p.users_profile.CreateDTO, session: AsyncSession) -> models.UserProfile:
+    row = (await session.execute(st.INSERT_PROFILE, param.model_dump())).one()
+    return models.UserProfile(*row)
 
-async def create(param: p.users_profile.CreateDTO, session: AsyncSession) -> r.users_profile.CreateDTO:
-    profile = models.UserProfile(**param.model_dump())
-    session.add(profile)
-    await session.flush([profile])
-    return r.users_profile.CreateDTO.model_validate(profile)
+
+async def set_active(param: p.users_profile.SetActiveDTO, session: AsyncSession) -> bool:
+    result = await session.execute(
+        st.SET_PROFILE_ACTIVE, {"b_user_id": param.user_id, "is_active": param.is_active})
+    return result.rowcount > 0
+
+
+async def soft_delete(param: p.users_profile.SoftDeleteDTO, session: AsyncSession) -> int:
+    """Marks live profiles as deleted, returns the number of rows touched."""
+    result = await session.execute(st.SOFT_DELETE_PROFILES, {"b_user_ids": param.user_ids})
+    return result.rowcount
+
+
+async def update(param: p.users_profile.UpdateDTO, session: AsyncSession) -> models.UserSummary | None:
+    """
+    Applies a partial update in a single `UPDATE ... RETURNING` round trip.
+
+    The profile update runs in a data-modifying CTE and the outer statement
+    bumps `users.updated_at`, so nothing is loaded into the session and no row
+    is locked beyond the statement itself. When `expected_version` is given the
+    update only matches that version. Returns None when no live profile matched.
+    """
+    values = param.model_dump(exclude_unset=True, include=set(st.UPDATABLE_PROFILE_FIELDS))
+    fields = tuple(field for field in st.UPDATABLE_PROFILE_FIELDS if field in values)
+    check_version = param.expected_version is not None
+
+    params = {"b_user_id": param.user_id, **values}
+    if check_version:
+        params["b_expected_version"] = param.expected_version
+
+    row = (await session.execute(st.update_profile(fields, check_version), params)).one_or_none()
+    return None if row is None else models.UserSummary(*row)
+
+
+async def get_version(param: p.users_profile.GetVersionDTO, session: AsyncSession) -> int | None:
+    return await session.scalar(st.SELECT_PROFILE_VERSION, {"user_id": param.user_id})
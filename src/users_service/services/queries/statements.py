@@ -0,0 +1,257 @@
+"""
+Statements used by the queries, built once at import time.
+
+Every statement is a module-level Core (or ORM-enabled) construct with
+bound parameters only, so executing it never rebuilds SQL: SQLAlchemy
+memoizes the cache key on the statement object and reuses the compiled
+form from the engine's compiled cache. `warm_up()` fills that cache at
+startup, so even the first request after a deploy skips compilation.
+
+Statements which vary by shape (partial updates) come from `lru_cache`
+builders keyed by the shape, every shape being a separate cached statement.
+
+Statements read through Core only. Whatever they return is mapped by
+position into a `domain.models` dataclass, so the columns are listed in
+that dataclass's field order.
+"""
+from itertools import combinations
+from functools import lru_cache
+from typing import MutableMapping, NamedTuple
+
+import sqlalchemy as sa
+from loguru import logger
+from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Executable
+
+from src.users_service.config.settings import TIMEZONE
+from src.users_service.infrastructure.db import models
+
+
+class Prepared(NamedTuple):
+    statement: Executable
+    # Names of the parameters the statement is executed with, part of the compiled cache key
+    params: tuple[str, ...]
+
+
+_registry: list[Prepared] = []
+
+
+def prepared(statement: Executable, *params: str) -> Executable:
+    _registry.append(Prepared(statement, tuple(sorted(params))))
+    return statement
+
+
+users = models.User.__table__
+profiles = models.UserProfile.__table__
+auth = models.UserAuth.__table__
+
+utc_now = sa.func.timezone(str(TIMEZONE), sa.func.now())
+
+
+# ------------------------
+# users
+# ------------------------
+
+INSERT_USER = prepared(
+    sa.insert(users)
+    .values(id=sa.bindparam("id"))
+    .returning(users.c.id, users.c.created_at, users.c.updated_at),
+    "id",
+)
+
+# domain.models.UserSummary, one JOIN and only the needed columns
+_user_summaries = (
+    sa.select(users.c.id, users.c.created_at, users.c.updated_at,
+              profiles.c.language, profiles.c.is_active, profiles.c.version)
+    .join(profiles, profiles.c.user_id == users.c.id)
+    .where(~profiles.c.is_deleted)
+)
+
+SELECT_USER_SUMMARY = prepared(
+    _user_summaries.where(users.c.id == sa.bindparam("user_id")),
+    "user_id",
+)
+
+SELECT_USER_SUMMARIES = prepared(
+    _user_summaries.where(users.c.id.in_(sa.bindparam("user_ids", expanding=True))),
+    "user_ids",
+)
+
+# Locks the selected profiles until the purge transaction ends, concurrent purges skip them
+SELECT_EXPIRED_USERS = prepared(
+    sa.select(profiles.c.user_id)
+    .where(profiles.c.is_deleted,
+           profiles.c.deleted_at < utc_now - sa.bindparam("retention", type_=sa.Interval()))
+    .order_by(profiles.c.deleted_at)
+    .limit(sa.bindparam("limit"))
+    .with_for_update(skip_locked=True),
+    "retention", "limit",
+)
+
+SELECT_EXISTING_USERS = prepared(
+    sa.select(users.c.id).where(users.c.id.in_(sa.bindparam("user_ids", expanding=True))),
+    "user_ids",
+)
+
+DELETE_USERS = prepared(
+    sa.delete(users).where(users.c.id.in_(sa.bindparam("b_user_ids", expanding=True))),
+    "b_user_ids",
+)
+
+
+# ------------------------
+# user_profiles
+# ------------------------
+
+INSERT_PROFILE = prepared(
+    sa.insert(profiles)
+    .values(user_id=sa.bindparam("user_id"), language=sa.bindparam("language"))
+    .returning(profiles.c.user_id, profiles.c.language, profiles.c.is_active,
+               profiles.c.is_deleted, profiles.c.deleted_at, profiles.c.version),
+    "user_id", "language",
+)
+
+SET_PROFILE_ACTIVE = prepared(
+    sa.update(profiles)
+    .where(profiles.c.user_id == sa.bindparam("b_user_id"), ~profiles.c.is_deleted)
+    .values(is_active=sa.bindparam("is_active")),
+    "b_user_id", "is_active",
+)
+
+SOFT_DELETE_PROFILES = prepared(
+    sa.update(profiles)
+    .where(profiles.c.user_id.in_(sa.bindparam("b_user_ids", expanding=True)), ~profiles.c.is_deleted)
+    .values(is_deleted=True, is_active=False, deleted_at=utc_now)
+    # Bulk deletes run it once per chunk, which isn't an N+1
+    .execution_options(batched=True),
+    "b_user_ids",
+)
+
+SELECT_PROFILE_VERSION = prepared(
+    sa.select(profiles.c.version)
+    .where(profiles.c.user_id == sa.bindparam("user_id"), ~profiles.c.is_deleted),
+    "user_id",
+)
+
+UPDATABLE_PROFILE_FIELDS = ("language",)
+
+
+@lru_cache(maxsize=None)
+def update_profile(fields: tuple[str, ...], check_version: bool) -> Executable:
+    """
+    Partial profile update for one set of `fields`, see `queries.users_profile.update`.
+    Executed with `b_user_id`, one parameter per field and `b_expected_version`
+    when `check_version` is set.
+    """
+    conditions = [profiles.c.user_id == sa.bindparam("b_user_id"), ~profiles.c.is_deleted]
+    if check_version:
+        conditions.append(profiles.c.version == sa.bindparam("b_expected_version"))
+
+    updated_profile = (
+        sa.update(profiles)
+        .where(*conditions)
+        .values({**{field: sa.bindparam(field) for field in fields}, "version": profiles.c.version + 1})
+        .returning(profiles.c.user_id, profiles.c.language, profiles.c.is_active, profiles.c.version)
+        .cte("updated_profile")
+    )
+    return (
+        sa.update(users)
+        .where(users.c.id == updated_profile.c.user_id)
+        .values(updated_at=utc_now)
+        .returning(users.c.id, users.c.created_at, users.c.updated_at,
+                   updated_profile.c.language, updated_profile.c.is_active, updated_profile.c.version)
+    )
+
+
+def update_profile_params(fields: tuple[str, ...], check_version: bool) -> tuple[str, ...]:
+    return ("b_user_id", *fields, *(("b_expected_version",) if check_version else ()))
+
+
+# ------------------------
+# user_auth
+# ------------------------
+
+INSERT_AUTH = prepared(
+    sa.insert(auth)
+    .values(user_id=sa.bindparam("user_id"), username=sa.bindparam("username"))
+    .returning(auth.c.user_id, auth.c.username),
+    "user_id", "username",
+)
+
+USERNAME_EXISTS = prepared(
+    sa.select(sa.exists().where(sa.func.lower(auth.c.username) == sa.bindparam("username"))),
+    "username",
+)
+
+COUNT_USERNAMES = prepared(sa.select(sa.func.count()).select_from(auth))
+
+SELECT_USERNAMES = prepared(sa.select(auth.c.username))
+
+DELETE_AUTH = prepared(
+    sa.delete(auth).where(auth.c.user_id.in_(sa.bindparam("b_user_ids", expanding=True))),
+    "b_user_ids",
+)
+
+# Keyset-paginated by user id, claims made since `claimed_before` may still be waiting for their user
+SELECT_OLD_CLAIMS = prepared(
+    sa.select(auth.c.user_id)
+    .where(auth.c.created_at < sa.bindparam("claimed_before", type_=sa.DateTime()),
+           auth.c.user_id > sa.bindparam("after"))
+    .order_by(auth.c.user_id)
+    .limit(sa.bindparam("limit")),
+    "claimed_before", "after", "limit",
+)
+
+LAST_CLAIMED_AT = prepared(sa.select(sa.func.max(auth.c.created_at)))
+
+SELECT_CLAIMS_SINCE = prepared(
+    sa.select(auth.c.username, auth.c.created_at)
+    .where(auth.c.created_at >= sa.bindparam("claimed_since", type_=sa.DateTime())),
+    "claimed_since",
+)
+
+
+# ------------------------
+# Warm up
+# ------------------------
+
+def _all_prepared() -> list[Prepared]:
+    variants = [
+        Prepared(update_profile(fields, check_version), tuple(sorted(update_profile_params(fields, check_version))))
+        for size in range(len(UPDATABLE_PROFILE_FIELDS) + 1)
+        for fields in combinations(UPDATABLE_PROFILE_FIELDS, size)
+        for check_version in (False, True)
+    ]
+    return [*_registry, *variants]
+
+
+def compile_all(dialect: Dialect, compiled_cache: MutableMapping) -> int:
+    """
+    Compiles every statement into `compiled_cache` exactly as `Connection.execute`
+    would, returns the number of statements compiled.
+    """
+    compiled = 0
+    for statement, params in _all_prepared():
+        # Same call and cache key as Connection._execute_clauseelement
+        statement._compile_w_cache(dialect=dialect, compiled_cache=compiled_cache, column_keys=list(params))
+        compiled += 1
+    return compiled
+
+
+async def warm_up(engine: AsyncEngine) -> None:
+    """
+    Connects once, so the dialect is initialized against the server, and
+    compiles every statement into the engine's compiled cache.
+    """
+    async with engine.connect():
+        pass
+
+    sync_engine = engine.sync_engine
+    try:
+        compiled = compile_all(sync_engine.dialect, sync_engine._compiled_cache)
+    except (AttributeError, TypeError):
+        # Both are SQLAlchemy internals, statements are compiled lazily on first use instead
+        logger.exception("Could not precompile statements")
+    else:
+        logger.info("Precompiled {} statements", compiled)
@@ -0,0 +1,142 @@
+"""
+In-process username filter which lets availability checks answer
+"available" without a database round trip.
+
+Usernames claimed through this process are added right away. Claims made
+through other workers or replicas are picked up by `refresh()` every
+`USERNAME_FILTER_REFRESH_INTERVAL`, until then they read as available, and
+signing up with one fails with a conflict. Apart from that window the
+filter only produces false positives ("maybe taken"), which are resolved
+by the database. The unique index on `lower(username)` stays the source
+of truth for inserts.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from loguru import logger
+
+from src.users_service.config.settings import (
+    USERNAME_FILTER_ERROR_RATE, USERNAME_FILTER_GROWTH,
+    USERNAME_FILTER_MIN_CAPACITY, USERNAME_FILTER_SCAN_BATCH, USERNAME_FILTER_REFRESH_OVERLAP,
+)
+from src.users_service.infrastructure.db.sharding import ShardSessions
+from src.users_service.services import queries
+from src.users_service.utils.bloom import BloomFilter
+
+
+class UsernameFilter:
+    """
+    Keeps a `BloomFilter` of lower-cased usernames.
+
+    - `load()` bulk-loads a fresh filter from a streamed scan of every shard and swaps it in.
+      Usernames added while the scan runs are replayed into the new filter.
+    - `refresh()` adds the usernames claimed on each shard since the last load or
+      refresh, whichever process claimed them. Shards are followed by their own
+      `created_at` watermark, so clocks of the service and the databases never mix.
+    - `add()` registers a username inserted by this process.
+    - `might_exist()` returns False only when the username is definitely free.
+      Until the first load finishes every username "might exist".
+    """
+
+    def __init__(self,
+                 error_rate: float = USERNAME_FILTER_ERROR_RATE,
+                 min_capacity: int = USERNAME_FILTER_MIN_CAPACITY,
+                 growth: int = USERNAME_FILTER_GROWTH,
+                 scan_batch: int = USERNAME_FILTER_SCAN_BATCH,
+                 refresh_overlap: timedelta = USERNAME_FILTER_REFRESH_OVERLAP):
+        self.error_rate: float = error_rate
+        self.min_capacity: int = min_capacity
+        self.growth: int = growth
+        self.scan_batch: int = scan_batch
+        self.refresh_overlap: timedelta = refresh_overlap
+        self._bloom: BloomFilter | None = None
+        self._pending: list[str] | None = None
+        # Shard -> `created_at` of the newest claim seen there
+        self._watermarks: dict[str, datetime] = {}
+
+    @staticmethod
+    def normalize(username: str) -> str:
+        return username.lower()
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    async def load(self, shards: ShardSessions) -> None:
+        started = perf_counter()
+        sessions = shards.all().values()
+        self._pending = []
+        try:
+            # Taken before the scan, claims committed while it runs are picked up by the next refresh
+            for shard, session in shards.all().items():
+                self._advance(shard, await queries.users_auth.last_claimed_at(session))
+
+            counts = await asyncio.gather(*(queries.users_auth.count(session) for session in sessions))
+            capacity = max(self.min_capacity, sum(counts) * self.growth)
+            bloom = BloomFilter(capacity, self.error_rate)
+
+            for session in sessions:
+                async for username in queries.users_auth.stream_usernames(session, self.scan_batch):
+                    bloom.add(self.normalize(username))
+
+            for username in self._pending:
+                bloom.add(username)
+        finally:
+            self._pending = None
+
+        self._bloom = bloom
+        logger.info("Username filter loaded in {:.2f}s: {}", perf_counter() - started, self.stats())
+
+    async def refresh(self, shards: ShardSessions) -> int:
+        """Adds the usernames claimed since the previous load or refresh, returns how many were new."""
+        if self._bloom is None:
+            return 0
+
+        added = 0
+        for shard, watermark in list(self._watermarks.items()):
+            claims = await queries.users_auth.get_claims_since(
+                queries.p.users_auth.GetClaimsSinceDTO(claimed_since=watermark - self.refresh_overlap),
+                shards.for_shard(shard))
+            for username, created_at in claims:
+                # Claims seen by the previous refresh come back within the overlap
+                if not self.might_exist(username):
+                    self.add(username)
+                    added += 1
+                self._advance(shard, created_at)
+        return added
+
+    def _advance(self, shard: str, claimed_at: datetime | None) -> None:
+        if claimed_at is None:
+            # No claim on the shard yet, everything it gets from now on is new
+            claimed_at = datetime.min + self.refresh_overlap
+        current = self._watermarks.get(shard)
+        if current is None or claimed_at > current:
+            self._watermarks[shard] = claimed_at
+
+    def add(self, username: str) -> None:
+        username = self.normalize(username)
+        if self._pending is not None:
+            self._pending.append(username)
+        if self._bloom is not None:
+            self._bloom.add(username)
+
+    def might_exist(self, username: str) -> bool:
+        if self._bloom is None:
+            return True
+        return self.normalize(username) in self._bloom
+
+    def stats(self) -> dict:
+        if self._bloom is None:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "count": self._bloom.count,
+            "capacity": self._bloom.capacity,
+            "hash_count": self._bloom.hash_count,
+            "memory_bytes": self._bloom.memory_bytes,
+            "false_positive_rate": self._bloom.false_positive_rate,
+        }
+
+
+username_filter = UsernameFilter()
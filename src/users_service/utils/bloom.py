@@ -0,0 +1,73 @@
+"""
+A compact probabilistic set used to answer "definitely not present" questions
+without touching the database.
+"""
+from math import ceil, exp, log
+
+from xxhash import xxh3_128_intdigest
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    """
+    Classic Bloom filter over a `bytearray` bit set.
+
+    Membership checks never give false negatives: if `item in bloom` is False,
+    the item was never added. A True answer may be a false positive with a
+    probability close to `error_rate` as long as no more than `capacity`
+    items were added.
+
+    The `k` bit positions are derived from a single 128 bit xxh3 digest using
+    double hashing (`h1 + i * h2`), so every operation costs one hash call.
+
+    Usage Example:
+    --------------
+        bloom = BloomFilter(capacity=1_000, error_rate=0.01)
+        bloom.add("alice")
+        "alice" in bloom  # -> True
+        "bob" in bloom    # -> False (almost certainly)
+    """
+
+    __slots__ = ("capacity", "error_rate", "size", "hash_count", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError(f"{capacity} is not a valid capacity")
+        if not 0 < error_rate < 1:
+            raise ValueError(f"{error_rate} is not a valid error rate")
+
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self.size: int = ceil(-capacity * log(error_rate) / (log(2) ** 2))
+        self.hash_count: int = max(1, round(self.size / capacity * log(2)))
+        self.count: int = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = xxh3_128_intdigest(item.encode())
+        h1, h2 = digest & _MASK_64, (digest >> 64) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the bit set in bytes."""
+        return len(self._bits)
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Expected false positive rate for the number of items added so far."""
+        return (1 - exp(-self.hash_count * self.count / self.size)) ** self.hash_count
@@ -12,6 +12,13 @@ class UserProfile:
     language = Annotated[enums.UserLanguages, Field(default=enums.UserLanguages.EN)]
     is_active = Annotated[bool, Field(default=True)] 
     is_deleted = Annotated[bool, Field(default=False)] 
+    deleted_at = Annotated[datetime | None, Field(default=None)]
+    version = Annotated[int, Field(ge=1)]
+
+
+class UserAuth:
+    user_id = Annotated[UUID, Field()]
+    username = Annotated[str, Field(min_length=3, max_length=32, pattern=r"^[A-Za-z0-9_.]+$")]
 
 
 class User:
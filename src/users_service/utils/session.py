@@ -10,7 +10,7 @@ from enum import Enum
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.users_service.infrastructure.db.setup import session_factory
+from src.users_service.infrastructure.db.setup import session_factory_for
 from src.users_service.utils.misc import signature, memorize
 
 
@@ -33,20 +33,25 @@ class SessionDecorator:
     A decorator class for managing database sessions in FastAPI-based applications.
     This class injects an `AsyncSession` object into the decorated function,
     allowing seamless database transactions.
+
+    The session is bound to the shard owning the value of the `shard_key`
+    argument of the decorated function, unless a fixed session factory is given.
     
     Attributes:
         mode (str): Defines the type of session (`transaction` or `session`).
         autorollback (bool): Determines whether the session should rollback on exceptions.
         autocommit (bool): Determines whether the session should commit automatically.
         param_name (str): The keyword argument name under which the session is passed.
-        context_manager (Callable): Function to generate session contexts.
+        shard_key (str | None): The argument whose value (a user id or a lower-cased username) picks the shard.
+        context_manager (Callable | None): Function to generate session contexts, None when routed by shard.
     """
     def __init__(self,
                  mode: SessionMode | str = SessionMode.session,
                  autorollback: bool = True,
                  autocommit: bool = False,
                  param_name: str = "session",
-                 context_manager_builder: sessionmaker[AsyncSession] = session_factory):
+                 shard_key: str | None = None,
+                 context_manager_builder: sessionmaker[AsyncSession] | None = None):
         """
         Initializes the session factory.
 
@@ -55,14 +60,23 @@ class SessionDecorator:
             autorollback (bool): If True, rolls back transactions on exceptions.
             autocommit (bool): If True, commits the session after function execution.
             param_name (str): The keyword argument name for passing the session.
-            context_manager_builder (sessionmaker[AsyncSession]): A session factory.
+            shard_key (str | None): The argument of the decorated function which picks the shard.
+            context_manager_builder (sessionmaker[AsyncSession] | None): A fixed session factory.
+
+        Raises:
+            ValueError: If neither `shard_key` nor `context_manager_builder` is given.
         """
+        if shard_key is None and context_manager_builder is None:
+            raise ValueError("Either shard_key or context_manager_builder is required")
+
         self.mode: str = self.get_normalized_mode(mode=mode)
         self.autorollback: bool = autorollback
         self.autocommit: bool = autocommit
         self.param_name: str = param_name
-        self.context_manager: Callable[[], AsyncSession] = (
-            self.get_context_manager(context_manager_builder, self.mode)
+        self.shard_key: str | None = shard_key
+        self.context_manager: Callable[[], AsyncSession] | None = (
+            None if context_manager_builder is None
+            else self.get_context_manager(context_manager_builder, self.mode)
         )
 
     def get_normalized_mode(self, mode: SessionMode | str) -> str:
@@ -124,6 +138,22 @@ class SessionDecorator:
             case _:
                 raise ValueError(f"Invalid session mode: {mode}")
     
+    def resolve_context_manager(self, function: Callable, args: tuple, kwargs: dict) -> Callable[[], AsyncSession]:
+        """
+        Returns the fixed context manager, or the one of the shard owning the
+        `shard_key` argument of this call.
+
+        Raises:
+            TypeError: If the call doesn't pass the `shard_key` argument.
+        """
+        if self.context_manager is not None:
+            return self.context_manager
+
+        arguments = signature(function).bind_partial(*args, **kwargs).arguments
+        if self.shard_key not in arguments:
+            raise TypeError(f"{function.__qualname__}() needs the {self.shard_key!r} argument to pick a shard")
+        return self.get_context_manager(session_factory_for(arguments[self.shard_key]), self.mode)
+
     def __call__(self, function: Callable[P, Coroutine[None, None, R]]) -> Callable[P, Coroutine[None, None, R]]:
         """
         Allows the class instance to be used as an asynchronous decorator, injecting a database session
@@ -150,7 +180,7 @@ class SessionDecorator:
                 return await function(*args, **kwargs)
 
             # Otherwise, inject session via context manager
-            async with self.context_manager() as session:
+            async with self.resolve_context_manager(function, args, kwargs)() as session:
                 try:
                     kwargs[self.param_name] = session
                     result = await function(*args, **kwargs)
@@ -165,8 +195,8 @@ class SessionDecorator:
         return wrapper
 
 
-# Predefined decorators for session handling.
+# Predefined decorators for session handling, bound to the shard of the `user_id` argument.
 # `session` provides a standard session context.
 # `transaction` provides a transaction-bound session context.
-session = SessionDecorator()
-transaction = SessionDecorator(mode=SessionMode.transaction)
+session = SessionDecorator(shard_key="user_id")
+transaction = SessionDecorator(mode=SessionMode.transaction, shard_key="user_id")
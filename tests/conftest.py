@@ -0,0 +1,81 @@
+"""
+Shared fixtures.
+
+`shards` runs the service's queries against several local SQLite databases,
+one file per shard, routed by a real `HashRing`. The schema comes from the
+ORM models, PostgreSQL-only parts (partial indexes, `FOR UPDATE SKIP LOCKED`)
+are ignored by SQLite. Async tests are run by the anyio pytest plugin:
+
+    @pytest.mark.anyio
+    async def test_something(shards): ...
+"""
+import os
+from datetime import datetime
+from typing import AsyncIterator
+
+import pytest
+
+# Settings are read on import, the databases behind them are never connected to
+for name, value in {
+    "POSTGRESQL_USER": "test", "POSTGRESQL_PASSWORD": "test", "POSTGRESQL_HOST": "localhost",
+    "POSTGRESQL_PORT": "5432", "POSTGRESQL_DATABASE": "test",
+    "JWT_ALGORITHM": "HS256", "JWT_TOKEN": "test", "JWT_ISS": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.users_service.infrastructure.db import models  # noqa: E402
+from src.users_service.infrastructure.db.sharding import HashRing, ShardSessions  # noqa: E402
+
+
+SHARD_NAMES = ("s0", "s1", "s2")
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+def _sqlite_engine(path: str) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_functions(dbapi_connection, connection_record):
+        # Server defaults are `TIMEZONE('UTC', NOW())`, stored naive as the service expects
+        dbapi_connection.create_function("now", 0, lambda: datetime.utcnow().isoformat(" "))
+        dbapi_connection.create_function("timezone", 2, lambda zone, timestamp: timestamp)
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    return engine
+
+
+@pytest.fixture
+async def shard_engines(tmp_path) -> AsyncIterator[dict[str, AsyncEngine]]:
+    engines = {shard: _sqlite_engine(str(tmp_path / f"{shard}.db")) for shard in SHARD_NAMES}
+    for engine in engines.values():
+        async with engine.begin() as connection:
+            await connection.run_sync(models.Base.metadata.create_all)
+
+    yield engines
+
+    for engine in engines.values():
+        await engine.dispose()
+
+
+@pytest.fixture
+def session_factories(shard_engines) -> dict[str, sessionmaker[AsyncSession]]:
+    return {shard: sessionmaker(bind=engine, class_=AsyncSession) for shard, engine in shard_engines.items()}
+
+
+@pytest.fixture
+def ring() -> HashRing:
+    return HashRing(SHARD_NAMES, virtual_nodes=64)
+
+
+@pytest.fixture
+async def shards(session_factories, ring) -> AsyncIterator[ShardSessions]:
+    async with ShardSessions(session_factories, ring) as shards:
+        yield shards
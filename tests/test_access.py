@@ -0,0 +1,22 @@
+import pytest
+
+from src.users_service.api import access
+from src.users_service.config import settings
+
+
+def test_debug_is_off_by_default():
+    assert settings.Env.model_fields["DEBUG"].default is False
+
+
+@pytest.mark.parametrize("debug, debug_token, sent, expected", [
+    (False, None, None, False),
+    (False, None, "", False),
+    (False, "secret", None, False),
+    (False, "secret", "wrong", False),
+    (False, "secret", "secret", True),
+    (True, None, None, True),
+])
+def test_has_debug_access(monkeypatch, debug, debug_token, sent, expected):
+    monkeypatch.setattr(access, "DEBUG", debug)
+    monkeypatch.setattr(access, "DEBUG_TOKEN", debug_token)
+    assert access.has_debug_access(sent) is expected
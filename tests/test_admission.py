@@ -0,0 +1,114 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from src.users_service.infrastructure.admission import AdmissionController
+
+
+pytestmark = pytest.mark.anyio
+
+
+def controller(limit: int = 1, max_queue: int = 1, queue_timeout: float = 1.0, **kwargs) -> AdmissionController:
+    return AdmissionController(limit, max_queue, timedelta(seconds=queue_timeout), **kwargs)
+
+
+async def _queue(admission: AdmissionController, priority: int = 0) -> asyncio.Task:
+    task = asyncio.create_task(admission.acquire(priority))
+    await asyncio.sleep(0)
+    return task
+
+
+async def test_admits_up_to_the_limit():
+    admission = controller(limit=2, max_queue=0)
+    assert await admission.acquire() and await admission.acquire()
+    assert not await admission.acquire()
+
+    admission.release()
+    assert await admission.acquire()
+    assert admission.stats() == {
+        "limit": 2, "in_flight": 2, "queued": 0, "admitted": 3, "rejected": 1, "timed_out": 0,
+    }
+
+
+async def test_without_queue_rejects_right_away():
+    admission = controller(max_queue=0)
+    assert await admission.acquire()
+    assert not await admission.acquire(priority=-10)
+    assert admission.rejected == 1 and admission.queued == 0
+
+
+async def test_queued_request_gets_the_released_slot():
+    admission = controller()
+    assert await admission.acquire()
+    waiting = await _queue(admission)
+    assert admission.queued == 1
+
+    admission.release()
+    assert await waiting
+    assert (admission.in_flight, admission.queued, admission.admitted) == (1, 0, 2)
+
+
+async def test_timeouts_are_counted_once():
+    admission = controller(queue_timeout=0.01)
+    assert await admission.acquire()
+    assert not await admission.acquire()
+    assert (admission.timed_out, admission.rejected, admission.queued) == (1, 0, 0)
+
+
+async def test_full_queue_displaces_lower_priority():
+    admission = controller()
+    assert await admission.acquire()
+    background = await _queue(admission, priority=5)
+
+    urgent = await _queue(admission, priority=1)
+    assert not await background
+    assert admission.rejected == 1 and admission.queued == 1
+
+    admission.release()
+    assert await urgent
+
+
+async def test_full_queue_rejects_equal_or_lower_priority():
+    admission = controller()
+    assert await admission.acquire()
+    waiting = await _queue(admission, priority=1)
+
+    assert not await admission.acquire(priority=1)
+    assert not await admission.acquire(priority=2)
+    assert admission.rejected == 2 and admission.queued == 1
+
+    admission.release()
+    assert await waiting
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    admission = controller()
+    assert await admission.acquire()
+    waiting = await _queue(admission)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert admission.queued == 0
+
+    admission.release()
+    assert admission.in_flight == 0
+
+
+async def test_adaptive_limit_follows_latency():
+    admission = controller(limit=10, adaptive=True, min_limit=2, max_limit=20,
+                           latency_target=timedelta(milliseconds=100), backoff=0.5)
+    assert await admission.acquire()
+    admission.release(latency=1.0)
+    assert admission.limit == 5
+
+    # Backs off at most once per latency target
+    assert await admission.acquire()
+    admission.release(latency=1.0)
+    assert admission.limit == 5
+
+    for _ in range(50):
+        assert await admission.acquire()
+        admission.release(latency=0.01)
+    assert 5 < admission.limit <= 20
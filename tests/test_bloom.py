@@ -0,0 +1,58 @@
+import pickle
+from math import ceil, log
+
+import pytest
+
+from src.users_service.utils.bloom import BloomFilter
+
+
+ADDED = [f"user{i}" for i in range(10_000)]
+OTHERS = [f"other{i}" for i in range(20_000)]
+
+
+@pytest.fixture(scope="module")
+def bloom() -> BloomFilter:
+    bloom = BloomFilter(capacity=len(ADDED), error_rate=0.01)
+    for item in ADDED:
+        bloom.add(item)
+    return bloom
+
+
+def test_no_false_negatives(bloom):
+    assert all(item in bloom for item in ADDED)
+    assert len(bloom) == len(ADDED)
+
+
+def test_false_positive_rate_near_error_rate(bloom):
+    false_positives = sum(item in bloom for item in OTHERS) / len(OTHERS)
+    assert false_positives < 2 * bloom.error_rate
+    assert bloom.false_positive_rate == pytest.approx(bloom.error_rate, rel=0.1)
+
+
+@pytest.mark.parametrize("capacity, error_rate", [(1, 0.5), (1_000, 0.01), (1_000_000, 0.001)])
+def test_sizing(capacity, error_rate):
+    bloom = BloomFilter(capacity, error_rate)
+    assert bloom.size == ceil(-capacity * log(error_rate) / log(2) ** 2)
+    assert bloom.hash_count == max(1, round(bloom.size / capacity * log(2)))
+    assert bloom.memory_bytes == ceil(bloom.size / 8)
+
+
+def test_sizing_example():
+    bloom = BloomFilter(capacity=1_000, error_rate=0.01)
+    assert (bloom.size, bloom.hash_count, bloom.memory_bytes) == (9_586, 7, 1_199)
+
+
+@pytest.mark.parametrize("capacity, error_rate", [(0, 0.01), (-1, 0.01), (10, 0), (10, 1), (10, 1.5)])
+def test_rejects_invalid_parameters(capacity, error_rate):
+    with pytest.raises(ValueError):
+        BloomFilter(capacity, error_rate)
+
+
+def test_serialization_round_trip(bloom):
+    restored = pickle.loads(pickle.dumps(bloom))
+    assert (restored.capacity, restored.error_rate, restored.size, restored.hash_count, restored.count) == \
+        (bloom.capacity, bloom.error_rate, bloom.size, bloom.hash_count, bloom.count)
+    assert all(item in restored for item in ADDED)
+
+    restored.add("someone new")
+    assert "someone new" in restored and len(restored) == len(bloom) + 1
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from src.users_service.infrastructure.db.instrumentation import SQLInstrumentation, fingerprint
+from src.users_service.services import queries
+from src.users_service.services.queries import statements as st
+
+
+def _asyncpg_sql(statement: sa.Executable, **params) -> str:
+    """The SQL asyncpg is sent, expanding IN lists rendered for the given values."""
+    return str(statement.params(**params).compile(dialect=asyncpg.dialect(),
+                                                  compile_kwargs={"render_postcompile": True}))
+
+
+@pytest.mark.parametrize("count", [2, 3, 50])
+def test_asyncpg_in_lists_share_a_fingerprint(count):
+    single = _asyncpg_sql(st.SELECT_USER_SUMMARIES, user_ids=[uuid4()])
+    many = _asyncpg_sql(st.SELECT_USER_SUMMARIES, user_ids=[uuid4() for _ in range(count)])
+    assert "$2::UUID" in many
+
+    assert fingerprint(single) == fingerprint(many)
+    assert fingerprint(many)[1].endswith("IN (?)")
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT a FROM t WHERE b = $1::VARCHAR AND c < $2::TIMESTAMP WITHOUT TIME ZONE",
+     "SELECT a FROM t WHERE b = ? AND c < ?"),
+    ("SELECT a FROM t WHERE b = ANY($1::UUID[]) AND c = 'x'::userlanguages",
+     "SELECT a FROM t WHERE b = ANY(?) AND c = ?"),
+    ("SELECT a FROM t WHERE b = $1::VARCHAR(32) LIMIT $2::INTEGER",
+     "SELECT a FROM t WHERE b = ? LIMIT ?"),
+    ("SELECT a FROM t WHERE b IN (?, ?) AND c = :name", "SELECT a FROM t WHERE b IN (?) AND c = ?"),
+])
+def test_fingerprint_normalizes(statement, expected):
+    assert fingerprint(statement)[1] == expected
+
+
+
+
+@pytest.fixture
+def instrumentation(shard_engines) -> SQLInstrumentation:
+    instrumentation = SQLInstrumentation(slow_threshold=timedelta(hours=1), explain_sample_rate=0.0,
+                                         n_plus_one_threshold=3, max_fingerprints=100)
+    for engine in shard_engines.values():
+        instrumentation.install(engine)
+    return instrumentation
+
+
+@pytest.mark.anyio
+async def test_failed_statements_leave_no_start_behind(instrumentation, shard_engines):
+    engine = shard_engines["s0"]
+    async with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(sa.exc.OperationalError):
+                await connection.execute(sa.text("SELECT * FROM missing_table"))
+        await connection.execute(sa.text("SELECT 1"))
+        info = await connection.run_sync(lambda sync_connection: sync_connection.info)
+        assert info["query_start"] == []
+
+
+@pytest.mark.anyio
+async def test_repeats_are_counted_per_request(instrumentation, shards):
+    user_id = uuid4()
+    session = shards.for_key(user_id)
+    with instrumentation.track_request("test") as request:
+        for _ in range(3):
+            await queries.users_profile.get_version(queries.p.users_profile.GetVersionDTO(user_id=user_id), session)
+
+    assert list(request.fingerprints.values()) == [3]
+
+
+@pytest.mark.anyio
+async def test_batched_statements_are_not_counted(instrumentation, shards):
+    session = shards.for_key(uuid4())
+    with instrumentation.track_request("test") as request:
+        for _ in range(3):
+            await session.execute(st.SOFT_DELETE_PROFILES, {"b_user_ids": [uuid4()]})
+
+    assert not request.fingerprints
+    assert sum(stats["count"] for stats in instrumentation.stats()) == 3
@@ -0,0 +1,85 @@
+from datetime import datetime
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from src.users_service.api.negotiation import MSGPACK, MsgPackRoute, _accepts, packb, unpackb
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("", False),
+    ("*/*", False),
+    ("application/json", False),
+    (MSGPACK, True),
+    ("application/x-msgpack", True),
+    ("Application/MsgPack", True),
+    (f"{MSGPACK}, application/json", True),
+    (f"application/json, {MSGPACK};q=0.9", False),
+    (f"application/json;q=0.5, {MSGPACK}", True),
+    (f"{MSGPACK};q=0", False),
+    (f"{MSGPACK};q=0.8, */*;q=0.8", True),
+    (f"{MSGPACK};q=oops", True),
+])
+def test_accepts(accept, expected):
+    assert _accepts(accept) is expected
+
+
+class Item(BaseModel):
+    id: UUID
+    created_at: datetime
+
+
+ITEM_ID = uuid4()
+
+
+@pytest.fixture
+def client() -> TestClient:
+    router = APIRouter(route_class=MsgPackRoute)
+
+    @router.get("/item", response_model=Item)
+    async def item():
+        return {"id": ITEM_ID, "created_at": datetime(2026, 1, 1, 12)}
+
+    @router.get("/raw")
+    async def raw():
+        return Response(b"raw", headers={"Vary": "Origin"})
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_json_answer_varies_on_accept(client):
+    response = client.get("/item")
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept"
+    assert response.json()["id"] == str(ITEM_ID)
+
+
+def test_msgpack_answer_varies_on_accept(client):
+    response = client.get("/item", headers={"Accept": MSGPACK})
+    assert response.headers["content-type"] == MSGPACK
+    assert response.headers["vary"] == "Accept"
+    assert UUID(bytes=unpackb(response.content)["id"]) == ITEM_ID
+
+
+def test_vary_is_added_to_the_endpoints_own(client):
+    assert client.get("/raw").headers["vary"] == "Origin, Accept"
+
+
+def test_msgpack_request_body():
+    router = APIRouter(route_class=MsgPackRoute)
+
+    @router.post("/echo")
+    async def echo(item: Item) -> dict:
+        return {"id": str(item.id)}
+
+    app = FastAPI()
+    app.include_router(router)
+    body = packb({"id": str(ITEM_ID), "created_at": "2026-01-01T12:00:00"})
+    response = TestClient(app).post("/echo", content=body, headers={"Content-Type": MSGPACK})
+    assert response.json() == {"id": str(ITEM_ID)}
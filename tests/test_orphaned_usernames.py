@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from src.users_service.domain.models import enums
+from src.users_service.services import flows, queries
+from src.users_service.services.queries import statements as st
+
+
+pytestmark = pytest.mark.anyio
+
+
+def _username_on_other_shard(ring, user_id) -> str:
+    user_shard = ring.shard_for(user_id)
+    return next(name for name in (f"user{i}" for i in range(1000)) if ring.shard_for(name) != user_shard)
+
+
+async def _claim(shards, user_id, username: str, claimed_at: datetime) -> None:
+    session = shards.for_key(username)
+    await session.execute(sa.insert(st.auth).values(user_id=user_id, username=username, created_at=claimed_at))
+    await session.commit()
+
+
+async def test_releases_old_claims_without_user(shards):
+    old = datetime.utcnow() - timedelta(hours=1)
+    orphan_id = uuid4()
+    await _claim(shards, orphan_id, _username_on_other_shard(shards.ring, orphan_id), old)
+
+    assert await flows.release_orphaned_usernames(shards) == 1
+
+    session = shards.for_key(_username_on_other_shard(shards.ring, orphan_id))
+    assert await queries.users_auth.count(session) == 0
+
+
+async def test_keeps_recent_claims_and_claims_with_user(shards):
+    # Claimed moments ago, the user may still be on its way
+    pending_id = uuid4()
+    await _claim(shards, pending_id, _username_on_other_shard(shards.ring, pending_id), datetime.utcnow())
+
+    user = await flows.create_user(flows.p.CreateUserDTO(language=enums.UserLanguages.EN, username="alice"), shards)
+    # The claim of a real user is old as well
+    await shards.for_key("alice").execute(
+        sa.update(st.auth).where(st.auth.c.username == "alice")
+        .values(created_at=datetime.utcnow() - timedelta(hours=1)))
+    await shards.for_key("alice").commit()
+
+    assert await flows.release_orphaned_usernames(shards) == 0
+
+    availability = await flows.check_username(flows.p.UsernameAvailabilityDTO(username="ALICE"),
+                                              shards.for_key("alice"))
+    assert not availability.available
+    assert user.username == "alice"
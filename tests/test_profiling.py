@@ -0,0 +1,62 @@
+import pytest
+
+from src.users_service.infrastructure.profiling import RequestProfiler
+
+
+@pytest.fixture
+def profiler(tmp_path) -> RequestProfiler:
+    return RequestProfiler(directory=tmp_path / "profiles", max_files=3)
+
+
+async def _profile(profiler: RequestProfiler, name: str) -> None:
+    profile = profiler.start()
+    assert profile is not None
+    sum(range(100))
+    await profiler.save(profile, name)
+
+
+@pytest.mark.anyio
+async def test_path_serves_saved_profiles_only(profiler, tmp_path):
+    await _profile(profiler, "20260101T120000-1-1-GET-users.pstats")
+    (tmp_path / "secret.pstats").write_text("outside")
+    (profiler.directory / "notes.txt").write_text("not a profile")
+
+    assert profiler.path("20260101T120000-1-1-GET-users.pstats") == \
+        profiler.directory / "20260101T120000-1-1-GET-users.pstats"
+    for name in ["../secret.pstats", "..%2Fsecret.pstats", "sub/x.pstats", "/etc/passwd",
+                 "notes.txt", "x.pstats.txt", "missing.pstats", ""]:
+        assert profiler.path(name) is None, name
+
+
+@pytest.mark.anyio
+async def test_only_the_newest_profiles_are_kept(profiler):
+    names = [f"2026010{i}T120000-1-{i}-GET-users.pstats" for i in range(1, 6)]
+    for name in names:
+        await _profile(profiler, name)
+
+    assert [path.name for path in profiler.profiles()] == names[:1:-1]
+    assert [saved["name"] for saved in profiler.saved()] == names[:1:-1]
+
+
+@pytest.mark.anyio
+async def test_one_request_is_profiled_at_a_time(profiler):
+    profile = profiler.start()
+    assert profile is not None
+    assert profiler.start() is None
+
+    await profiler.save(profile, "first.pstats")
+    assert profiler.path("first.pstats") is not None
+
+    # The lock is released once the profile is saved
+    await _profile(profiler, "second.pstats")
+
+
+@pytest.mark.anyio
+async def test_lock_is_released_when_saving_fails(profiler, tmp_path):
+    profiler.directory = tmp_path / "file"
+    profiler.directory.write_text("not a directory")
+
+    await profiler.save(profiler.start(), "lost.pstats")
+
+    profiler.directory = tmp_path / "profiles"
+    await _profile(profiler, "kept.pstats")
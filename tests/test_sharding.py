@@ -0,0 +1,128 @@
+from uuid import uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from src.users_service.domain import exceptions
+from src.users_service.domain.models import enums
+from src.users_service.infrastructure.db.sharding import HashRing, ShardSessions
+from src.users_service.services import flows, queries
+from src.users_service.services.queries import statements as st
+
+
+KEYS = [uuid4() for _ in range(5_000)]
+
+
+class TestHashRing:
+
+    def test_routing_is_stable(self):
+        first, second = HashRing(["a", "b", "c"], 64), HashRing(["c", "a", "b"], 64)
+        assert [first.shard_for(key) for key in KEYS] == [second.shard_for(key) for key in KEYS]
+
+    def test_usernames_and_ids_route_alike(self):
+        ring = HashRing(["a", "b"], 64)
+        key = uuid4()
+        assert ring.shard_for(key) == ring.shard_for(key.bytes)
+        assert ring.shard_for("alice") == ring.shard_for(b"alice")
+
+    def test_keys_spread_over_every_shard(self):
+        ring = HashRing(["a", "b", "c"], 256)
+        counts = {shard: len(keys) for shard, keys in ring.group(KEYS).items()}
+        assert set(counts) == {"a", "b", "c"}
+        assert min(counts.values()) > len(KEYS) / 3 * 0.75
+
+    def test_added_shard_only_takes_keys(self):
+        before, after = HashRing(["a", "b", "c"], 256), HashRing(["a", "b", "c", "d"], 256)
+        moved = [key for key in KEYS if before.shard_for(key) != after.shard_for(key)]
+        assert all(after.shard_for(key) == "d" for key in moved)
+        assert len(moved) < len(KEYS) / 4 * 1.5
+
+    def test_group_keeps_order(self):
+        ring = HashRing(["a", "b"], 64)
+        groups = ring.group(KEYS)
+        assert sorted(key for keys in groups.values() for key in keys) == sorted(KEYS)
+        for keys in groups.values():
+            members = set(keys)
+            assert keys == [key for key in KEYS if key in members]
+
+    def test_single_shard(self):
+        ring = HashRing(["only"], 1)
+        assert {ring.shard_for(key) for key in KEYS[:100]} == {"only"}
+
+    def test_needs_a_shard(self):
+        with pytest.raises(ValueError):
+            HashRing([], 64)
+
+
+class TestShardSessions:
+
+    @pytest.mark.anyio
+    async def test_one_session_per_shard(self, shards):
+        user_id = uuid4()
+        session = shards.for_key(user_id)
+        assert shards.for_shard(shards.ring.shard_for(user_id)) is session
+        assert set(shards.all()) == set(shards.ring.shards)
+        assert shards.all()[shards.ring.shard_for(user_id)] is session
+
+    @pytest.mark.anyio
+    async def test_close_forgets_sessions(self, shards):
+        user_id = uuid4()
+        session = shards.for_key(user_id)
+        await shards.close()
+        assert shards.for_key(user_id) is not session
+
+
+async def _count(shards, shard: str, table: sa.Table) -> int:
+    return await shards.for_shard(shard).scalar(sa.select(sa.func.count()).select_from(table))
+
+
+@pytest.mark.anyio
+async def test_user_and_username_live_on_their_shards(shards):
+    user = await flows.create_user(flows.p.CreateUserDTO(language=enums.UserLanguages.EN, username="Alice"), shards)
+
+    user_shard, username_shard = shards.ring.shard_for(user.id), shards.ring.shard_for("alice")
+    for shard in shards.ring.shards:
+        assert await _count(shards, shard, st.users) == (shard == user_shard)
+        assert await _count(shards, shard, st.auth) == (shard == username_shard)
+
+
+@pytest.mark.anyio
+async def test_usernames_are_unique_across_shards(shards):
+    await flows.create_user(flows.p.CreateUserDTO(language=enums.UserLanguages.EN, username="alice"), shards)
+
+    with pytest.raises(exceptions.UsernameTakenError):
+        await flows.create_user(flows.p.CreateUserDTO(language=enums.UserLanguages.EN, username="ALICE"), shards)
+
+
+@pytest.mark.anyio
+async def test_failed_creation_releases_the_claim(shards, session_factories, ring, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(queries.users, "create", fail)
+    # Usernames land on the user's shard or on another one, where the claim is committed first
+    for attempt in range(20):
+        # One unit of work per request, closing it rolls back whatever wasn't committed
+        async with ShardSessions(session_factories, ring) as request_shards:
+            with pytest.raises(RuntimeError):
+                await flows.create_user(
+                    flows.p.CreateUserDTO(language=enums.UserLanguages.EN, username=f"user{attempt}"), request_shards)
+
+    for shard in shards.ring.shards:
+        assert await _count(shards, shard, st.auth) == 0
+
+
+@pytest.mark.anyio
+async def test_reads_and_deletes_span_shards(shards):
+    created = [
+        await flows.create_user(flows.p.CreateUserDTO(language=enums.UserLanguages.EN), shards) for _ in range(30)
+    ]
+    assert len({shards.ring.shard_for(user.id) for user in created}) == len(shards.ring.shards)
+
+    user_ids = [user.id for user in reversed(created)]
+    found = await flows.get_users(flows.p.GetUsersDTO(user_ids=[*user_ids, uuid4()]), shards)
+    assert [user.id for user in found] == user_ids
+
+    assert await flows.delete_users(flows.p.DeleteUsersDTO(user_ids=user_ids[:10]), shards) == 10
+    found = await flows.get_users(flows.p.GetUsersDTO(user_ids=user_ids), shards)
+    assert [user.id for user in found] == user_ids[10:]
@@ -0,0 +1,80 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.users_service.api.router import router
+from src.users_service.domain import exceptions
+from src.users_service.domain.models import enums, models
+from src.users_service.services import flows
+from src.users_service.services.dependencies import db
+
+
+USER_ID = uuid4()
+
+
+@pytest.fixture
+def updates(monkeypatch) -> list:
+    """Parameters the flow was called with. It answers with version 8, or a conflict on `If-Match: "1"`."""
+    calls = []
+
+    async def update_profile(param, session):
+        calls.append(param)
+        if param.expected_version == 1:
+            raise exceptions.VersionConflictError(7)
+        return models.UserSummary(id=param.user_id, created_at=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 2),
+                                  language=param.language, is_active=True, version=8)
+
+    monkeypatch.setattr(flows, "update_profile", update_profile)
+    return calls
+
+
+@pytest.fixture
+def client() -> TestClient:
+    async def no_session(user_id):
+        yield None
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[db.user_session] = no_session
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("body", [{}, {"unknown": "field"}])
+def test_empty_patch_is_rejected(client, updates, body):
+    response = client.patch(f"/users/{USER_ID}/profile", json=body)
+    assert response.status_code == 422
+    assert updates == []
+
+
+def test_language_is_updated(client, updates):
+    response = client.patch(f"/users/{USER_ID}/profile", json={"language": "RU"})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"8"'
+    assert response.json()["language"] == "RU" and response.json()["version"] == 8
+    assert [(param.user_id, param.language, param.expected_version) for param in updates] == \
+        [(USER_ID, enums.UserLanguages.RU, None)]
+
+
+@pytest.mark.parametrize("if_match, expected_version", [('"5"', 5), ('W/"5"', 5), ("5", 5), ("*", None)])
+def test_if_match_is_forwarded(client, updates, if_match, expected_version):
+    response = client.patch(f"/users/{USER_ID}/profile", json={"language": "UZ"}, headers={"If-Match": if_match})
+
+    assert response.status_code == 200
+    assert [param.expected_version for param in updates] == [expected_version]
+
+
+def test_stale_version_is_a_precondition_failure(client, updates):
+    response = client.patch(f"/users/{USER_ID}/profile", json={"language": "UZ"}, headers={"If-Match": '"1"'})
+
+    assert response.status_code == 412
+    assert response.headers["ETag"] == '"7"'
+
+
+def test_invalid_if_match(client, updates):
+    response = client.patch(f"/users/{USER_ID}/profile", json={"language": "UZ"}, headers={"If-Match": "abc"})
+    assert response.status_code == 400
+    assert updates == []
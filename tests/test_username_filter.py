@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from src.users_service.services.queries import statements as st
+from src.users_service.services.usernames import UsernameFilter
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def _claim_elsewhere(shards, username: str, claimed_at: datetime | None = None) -> None:
+    """A claim made through another worker, this process' filter never sees `add()`."""
+    values = {"user_id": uuid4(), "username": username}
+    if claimed_at is not None:
+        values["created_at"] = claimed_at
+    session = shards.for_key(username.lower())
+    await session.execute(sa.insert(st.auth).values(**values))
+    await session.commit()
+
+
+@pytest.fixture
+def username_filter() -> UsernameFilter:
+    return UsernameFilter(min_capacity=1_000, refresh_overlap=timedelta(minutes=1))
+
+
+async def test_load_reads_every_shard(shards, username_filter):
+    names = [f"user{i}" for i in range(30)]
+    for name in names:
+        await _claim_elsewhere(shards, name)
+    assert not username_filter.ready and username_filter.might_exist("anyone")
+
+    await username_filter.load(shards)
+
+    assert all(username_filter.might_exist(name.upper()) for name in names)
+
+
+async def test_refresh_picks_up_claims_from_other_processes(shards, username_filter):
+    await _claim_elsewhere(shards, "alice")
+    await username_filter.load(shards)
+    assert not username_filter.might_exist("bob")
+
+    await _claim_elsewhere(shards, "Bob")
+    assert await username_filter.refresh(shards) == 1
+    assert username_filter.might_exist("bob")
+
+    # Within the overlap the same claims come back, they aren't counted twice
+    assert await username_filter.refresh(shards) == 0
+    assert len(username_filter._bloom) == 2
+
+
+async def test_refresh_looks_back_for_late_commits(shards, username_filter):
+    names = {shard: [f"user{i}" for i in range(1000) if shards.ring.shard_for(f"user{i}") == shard][:3]
+             for shard in shards.ring.shards}
+    for loaded, _, _ in names.values():
+        await _claim_elsewhere(shards, loaded)
+    await username_filter.load(shards)
+
+    for _, late, old in names.values():
+        # Stamped before the newest claim seen on the shard, committed after the load
+        await _claim_elsewhere(shards, late, datetime.utcnow() - timedelta(seconds=30))
+        # Older than the overlap, a full rebuild picks it up
+        await _claim_elsewhere(shards, old, datetime.utcnow() - timedelta(hours=1))
+
+    assert await username_filter.refresh(shards) == len(shards.ring.shards)
+    assert all(username_filter.might_exist(late) for _, late, _ in names.values())
+
+
+async def test_refresh_before_load_is_a_no_op(shards, username_filter):
+    await _claim_elsewhere(shards, "alice")
+    assert await username_filter.refresh(shards) == 0
+    assert not username_filter.ready
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from loguru import logger
+
+from src.users_service.infrastructure.watchdog import LoopWatchdog
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def watchdog():
+    watchdog = LoopWatchdog(interval=timedelta(milliseconds=10), threshold=timedelta(milliseconds=50),
+                            log_interval=timedelta(minutes=1), buckets=(1, 10, 100, 1000))
+    watchdog.start()
+    yield watchdog
+    await watchdog.stop()
+
+
+@pytest.fixture
+def reports() -> list[str]:
+    messages = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(sink)
+
+
+def _block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def test_idle_loop_has_no_stalls(watchdog):
+    await asyncio.sleep(0.2)
+
+    stats = watchdog.stats()
+    assert stats["count"] > 0
+    assert (stats["stalls"], stats["reported"]) == (0, 0)
+    assert stats["buckets"]["100"] == stats["count"]
+
+
+async def test_blocked_loop_is_measured_and_reported(watchdog, reports):
+    await asyncio.sleep(0.05)
+    _block_the_loop(0.3)
+    await asyncio.sleep(0.05)
+
+    stats = watchdog.stats()
+    buckets = stats["buckets"]
+    assert list(buckets) == ["1", "10", "100", "1000", "+Inf"]
+    assert buckets["+Inf"] == stats["count"]
+    # The heartbeat sleeping through the block, its lag is the only one above 100ms
+    assert buckets["1000"] - buckets["100"] == 1
+    assert 250 <= stats["max_ms"] < 1000
+    assert (stats["stalls"], stats["reported"]) == (1, 1)
+
+    assert len(reports) == 1
+    assert "Event loop blocked for" in reports[0] and "_block_the_loop" in reports[0]
+
+
+async def test_reports_are_rate_limited(watchdog, reports):
+    for _ in range(3):
+        _block_the_loop(0.15)
+        await asyncio.sleep(0.05)
+
+    stats = watchdog.stats()
+    assert stats["buckets"]["1000"] - stats["buckets"]["100"] == 3
+    # Every stall is counted, a single one is logged per `log_interval`
+    assert (stats["stalls"], stats["reported"]) == (3, 1)
+    assert len(reports) == 1